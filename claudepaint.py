@@ -3,16 +3,23 @@
 
 import math
 import os
+import re
 import sys
+import time
+import zlib
 from collections import deque
+from concurrent.futures import ThreadPoolExecutor
 from enum import Enum, auto
+from functools import lru_cache
 
 from PyQt5.QtCore import (
-    QPoint, QPointF, QRect, QRectF, QSettings, QSize, QTimer, Qt, pyqtSignal,
+    QBuffer, QPoint, QPointF, QRect, QRectF, QSettings, QSize, QTimer, Qt,
+    pyqtSignal,
 )
 from PyQt5.QtGui import (
-    QBrush, QColor, QCursor, QFont, QFontMetricsF, QIcon, QImage,
-    QKeySequence, QPainter, QPainterPath, QPen, QPixmap, QTransform,
+    QBitmap, QBrush, QColor, QCursor, QFont, QFontMetrics, QFontMetricsF,
+    QIcon, QImage, QImageReader, QKeySequence, QPainter, QPainterPath, QPen, QPixmap,
+    QPolygonF, QRegion, QTransform,
 )
 from PyQt5.QtWidgets import (
     QAction, QApplication, QColorDialog, QComboBox, QDialog, QDialogButtonBox,
@@ -22,6 +29,16 @@ from PyQt5.QtWidgets import (
     QVBoxLayout, QWidget,
 )
 
+try:
+    import numpy as np
+except ImportError:  # optional: pixel loops fall back to pure Python
+    np = None
+
+try:
+    from numba import njit
+except ImportError:  # optional: JIT-compiled pixel kernels
+    njit = None
+
 # ---------------------------------------------------------------------------
 # Constants
 # ---------------------------------------------------------------------------
@@ -30,6 +47,9 @@ DEFAULT_WIDTH = 800
 DEFAULT_HEIGHT = 600
 DEFAULT_DIR = os.path.expanduser("~/Pictures")
 MAX_UNDO = 50
+UNDO_MEMORY_BUDGET = 256 * 1024 * 1024  # bytes of pixels kept for undo
+UNDO_COMPRESS_MIN = 256 * 1024  # undo regions at least this big are packed
+CANVAS_FORMAT = QImage.Format_ARGB32_Premultiplied
 ZOOM_MIN = 0.25
 ZOOM_MAX = 64.0
 ZOOM_STEP = 0.25
@@ -91,6 +111,315 @@ TOOL_GROUPS = [
     ("Shapes", [ToolType.LINE, ToolType.RECTANGLE, ToolType.ELLIPSE]),
     ("Tools", [ToolType.TEXT, ToolType.FILL, ToolType.PICKER]),
 ]
+ALL_TOOLS = tuple(tt for _, tools in TOOL_GROUPS for tt in tools)
+
+
+# ---------------------------------------------------------------------------
+# Pixel helpers (NumPy fast paths, pure-Python fallbacks)
+# ---------------------------------------------------------------------------
+def _image_array(img, readonly=False):
+    """Return a writable (h, w) uint32 NumPy view of a 32-bit QImage.
+
+    The view aliases the image's pixel buffer, so writes land directly in
+    *img*.  Each element is one 0xAARRGGBB pixel.  With *readonly* the
+    view is read-only and never forces a shared image to detach.
+    """
+    ptr = img.constBits() if readonly else img.bits()
+    ptr.setsize(img.sizeInBytes())
+    arr = np.frombuffer(ptr, np.uint32)
+    return arr.reshape(img.height(), img.bytesPerLine() // 4)[:, :img.width()]
+
+
+def _is_opaque(img):
+    """Return True if every pixel of the 32-bit *img* has alpha 255.
+
+    Without NumPy, images with an alpha channel are reported as not
+    opaque rather than scanned.
+    """
+    if not img.hasAlphaChannel():
+        return True
+    if np is None:
+        return False
+    return bool(_image_array(img, True).min() >= 0xFF000000)
+
+
+def _pixel_value(color, fmt):
+    """Return *color* encoded as a raw 32-bit pixel of QImage format *fmt*."""
+    px = QImage(1, 1, fmt)
+    px.setPixelColor(0, 0, color)
+    return px.pixel(0, 0)
+
+
+def _changed_rect(before, after):
+    """Return the bounding QRect of pixels that differ between two images.
+
+    Returns None when the images are identical.  Both images must have the
+    same size and format.
+    """
+    if before.cacheKey() == after.cacheKey():
+        return None
+    if np is None:
+        return None if before == after else after.rect()
+    diff = _image_array(before, True) != _image_array(after, True)
+    rows = np.flatnonzero(diff.any(axis=1))
+    if not len(rows):
+        return None
+    cols = np.flatnonzero(diff.any(axis=0))
+    return QRect(QPoint(int(cols[0]), int(rows[0])),
+                 QPoint(int(cols[-1]), int(rows[-1])))
+
+
+def _scanline_fill(arr, x, y, fill):
+    """Flood-fill the 4-connected region containing (x, y) with *fill*.
+
+    Works on whole horizontal runs: each seed's run is located by binary
+    search in the row's (lazily computed, cached) list of non-target
+    columns, written with one slice assignment, and only the first pixel of
+    every matching run on the rows above and below is pushed as a new seed.
+    Filling a run never moves the edges of the other runs in its row, so
+    the cached edges stay valid, and filled pixels no longer match the
+    target, so no visited set is needed.
+
+    Returns the bounding QRect of the filled pixels, or None if nothing
+    was filled.
+    """
+    if _scanline_fill_jit is not None:
+        x0, y0, x1, y1 = _scanline_fill_jit(arr, x, y, fill)
+        return QRect(QPoint(x0, y0), QPoint(x1, y1)) if x1 >= 0 else None
+    h, w = arr.shape
+    target = arr[y, x]
+    if target == fill:
+        return None
+    edges = {}  # row -> sorted columns that are not the target colour
+    x0, x1 = w, 0
+    seeds = [(x, y)]
+    while seeds:
+        x, y = seeds.pop()
+        row = arr[y]
+        if row[x] != target:
+            continue
+        e = edges.get(y)
+        if e is None:
+            e = edges[y] = np.flatnonzero(row != target)
+        i = int(np.searchsorted(e, x))
+        lx = int(e[i - 1]) + 1 if i else 0
+        rx = int(e[i]) if i < len(e) else w
+        row[lx:rx] = fill
+        x0, x1 = min(x0, lx), max(x1, rx)
+        for ny in (y - 1, y + 1):
+            if 0 <= ny < h:
+                match = arr[ny, lx:rx] == target
+                starts = match.copy()
+                starts[1:] &= ~match[:-1]
+                seeds.extend((lx + int(sx), ny) for sx in np.flatnonzero(starts))
+    # Every filled row had its edges computed exactly once
+    return QRect(x0, min(edges), x1 - x0, max(edges) - min(edges) + 1)
+
+
+def _queue_fill(img, x, y, fill):
+    """Pure-Python flood fill used when NumPy is unavailable.
+
+    Reads and writes raw 32-bit pixels through a memoryview of the image
+    buffer instead of pixel()/setPixel() calls.  Pixels are filled as they
+    are queued, so a filled pixel no longer matches the target and doubles
+    as the "visited" marker.  Returns the image rect, or None if nothing
+    was filled.
+    """
+    w, h = img.width(), img.height()
+    stride = img.bytesPerLine() // 4
+    ptr = img.bits()
+    ptr.setsize(img.sizeInBytes())
+    buf = memoryview(ptr).cast('I')
+    i = y * stride + x
+    target = buf[i]
+    if target == fill:
+        return None
+    buf[i] = fill
+    queue = deque()
+    queue.append((x, y))
+    while queue:
+        cx, cy = queue.popleft()
+        i = cy * stride + cx
+        if cx > 0 and buf[i - 1] == target:
+            buf[i - 1] = fill
+            queue.append((cx - 1, cy))
+        if cx < w - 1 and buf[i + 1] == target:
+            buf[i + 1] = fill
+            queue.append((cx + 1, cy))
+        if cy > 0 and buf[i - stride] == target:
+            buf[i - stride] = fill
+            queue.append((cx, cy - 1))
+        if cy < h - 1 and buf[i + stride] == target:
+            buf[i + stride] = fill
+            queue.append((cx, cy + 1))
+    return img.rect()
+
+
+if njit is not None:
+    @njit(cache=True, boundscheck=False)
+    def _scanline_fill_jit(arr, x, y, fill):
+        """Compiled _scanline_fill: plain pixel loops instead of NumPy calls.
+
+        Returns the filled bounding box as inclusive (x0, y0, x1, y1), or
+        x1 == -1 if nothing was filled.
+        """
+        h, w = arr.shape
+        target = arr[y, x]
+        if target == fill:
+            return 0, 0, -1, -1
+        x0, y0, x1, y1 = w, h, -1, -1
+        seeds = [(x, y)]
+        while len(seeds):
+            sx, sy = seeds.pop()
+            if arr[sy, sx] != target:
+                continue
+            lx = sx
+            while lx > 0 and arr[sy, lx - 1] == target:
+                lx -= 1
+            rx = sx + 1
+            while rx < w and arr[sy, rx] == target:
+                rx += 1
+            for i in range(lx, rx):
+                arr[sy, i] = fill
+            x0, x1 = min(x0, lx), max(x1, rx - 1)
+            y0, y1 = min(y0, sy), max(y1, sy)
+            for ny in (sy - 1, sy + 1):
+                if 0 <= ny < h:
+                    prev = False
+                    for i in range(lx, rx):
+                        match = arr[ny, i] == target
+                        if match and not prev:
+                            seeds.append((i, ny))
+                        prev = match
+        return x0, y0, x1, y1
+
+    @njit(cache=True, boundscheck=False)
+    def _snap_alpha_jit(src, dst):
+        """Compiled alpha snap of *src* into *dst* (may be the same array).
+
+        One branch-free pass LLVM can vectorise.
+        """
+        h, w = src.shape
+        for y in range(h):
+            for x in range(w):
+                v = src[y, x]
+                dst[y, x] = (v | 0xFF000000) if v >= 0x01000000 else 0
+
+    @njit(cache=True, boundscheck=False)
+    def _content_bounds_jit(arr):
+        """Compiled ResizeDialog._content_bounds on a premultiplied array.
+
+        Returns inclusive (x0, y0, x1, y1), or x1 == -1 if every pixel is
+        transparent or white.  Rows are scanned inwards from the top and
+        bottom edges, then each row in between only up to the columns
+        already known to hold content, so no mask is allocated.
+        """
+        h, w = arr.shape
+        y0, y1 = h, -1
+        x0, x1 = w, -1
+        for y in range(h):
+            for x in range(w):
+                v = arr[y, x]
+                if v >= 0x01000000 and v != (v >> 24) * 0x01010101:
+                    y0 = y
+                    x0 = min(x0, x)
+                    x1 = max(x1, x)
+                    break
+            if y0 < h:
+                break
+        if y0 == h:
+            return 0, 0, -1, -1
+        for y in range(h - 1, y0 - 1, -1):
+            for x in range(w):
+                v = arr[y, x]
+                if v >= 0x01000000 and v != (v >> 24) * 0x01010101:
+                    y1 = y
+                    break
+            if y1 >= 0:
+                break
+        for y in range(y0, y1 + 1):
+            for x in range(x0):
+                v = arr[y, x]
+                if v >= 0x01000000 and v != (v >> 24) * 0x01010101:
+                    x0 = x
+                    break
+            for x in range(w - 1, x1, -1):
+                v = arr[y, x]
+                if v >= 0x01000000 and v != (v >> 24) * 0x01010101:
+                    x1 = x
+                    break
+        return x0, y0, x1, y1
+else:
+    _scanline_fill_jit = None
+    _snap_alpha_jit = None
+    _content_bounds_jit = None
+
+
+def _warm_up_kernels():
+    """Compile (or load from Numba's cache) the JIT kernels ahead of use.
+
+    Called once the main window is up, so the first fill or selection
+    commit does not pay the compile.  The kernels run on views of a real
+    image so that they specialise for the same array layouts as later
+    calls: whole images are C-contiguous, clipped sub-rects are not.
+    """
+    if njit is None or np is None:
+        return
+    img = QImage(2, 2, CANVAS_FORMAT)
+    img.fill(0)
+    whole = _image_array(img)
+    part = whole[:, :1]                      # same shape as column
+    column = np.zeros((2, 1), np.uint32)     # C-contiguous
+    _scanline_fill_jit(whole, 0, 0, 1)
+    _snap_alpha_jit(whole, whole)
+    # ResizeDialog scans a read-only view, a separate Numba signature
+    _content_bounds_jit(_image_array(img, True))
+    for src, dst in ((column, part), (part, column), (part, part)):
+        _snap_alpha_jit(src, dst)
+
+
+# ---------------------------------------------------------------------------
+# Shared pens / brushes
+# ---------------------------------------------------------------------------
+# Tools ask for the same few pens on every mouse event.  QPainter copies the
+# pen/brush it is given, so handing out shared instances is safe as long as
+# callers never modify them.
+@lru_cache(maxsize=128)
+def _pen(rgba, width, cap=Qt.SquareCap, join=Qt.BevelJoin):
+    """Return a cached solid QPen for the 0xAARRGGBB colour *rgba*."""
+    return QPen(QColor.fromRgba(rgba), width, Qt.SolidLine, cap, join)
+
+
+@lru_cache(maxsize=32)
+def _brush(rgba):
+    """Return a cached solid QBrush for the 0xAARRGGBB colour *rgba*."""
+    return QBrush(QColor.fromRgba(rgba))
+
+
+# Several sizes are kept so scrubbing the brush-size control back and forth
+# does not re-trace the same outlines.
+@lru_cache(maxsize=16)
+def _brush_outline(brush_size):
+    """Return a cached QPainterPath along the pixel edges of a round brush
+    dot of *brush_size*, centered at the origin in canvas pixels."""
+    # Rasterize one dot at canvas resolution (no AA, matches brush drawing)
+    pad = 2
+    s = brush_size + pad * 2
+    center = s // 2
+    img = QImage(s, s, QImage.Format_ARGB32_Premultiplied)
+    img.fill(Qt.transparent)
+    p = QPainter(img)
+    p.setRenderHint(QPainter.Antialiasing, False)
+    p.setPen(QPen(Qt.white, brush_size, Qt.SolidLine, Qt.RoundCap))
+    p.drawPoint(center, center)
+    p.end()
+
+    # QRegion splits the dot's pixels into row spans; simplified() merges
+    # those rectangles into the outline polygon along the pixel edges.
+    region = QRegion(QBitmap.fromImage(img.createAlphaMask()))
+    path = QPainterPath()
+    path.addRegion(region.translated(-center, -center))
+    return path.simplified()
 
 
 # ---------------------------------------------------------------------------
@@ -100,6 +429,7 @@ class BaseTool:
     """Base interface for all drawing tools."""
 
     name = "Base"
+    supports_selection = False  # cut/copy/delete apply to this tool
 
     def __init__(self, canvas):
         self.canvas = canvas
@@ -125,176 +455,185 @@ class BaseTool:
     def deactivate(self):
         pass
 
+    def end_stroke(self):
+        """Finish a drag that is still drawing straight into the image."""
+        pass
 
-class PencilTool(BaseTool):
-    name = "Pencil"
 
-    def __init__(self, canvas):
-        super().__init__(canvas)
-        self._last = None
+class _StrokeBatch:
+    """Collects the points of one freehand stroke and draws them in batches.
 
-    def mouse_press(self, event):
-        self.canvas.save_undo()
-        self._last = event.pos()
-        p = self.canvas.make_painter()
-        color = self.canvas.fg_color if event.button() == Qt.LeftButton else self.canvas.bg_color
-        p.setPen(QPen(color, 1, Qt.SolidLine, Qt.RoundCap))
-        p.drawPoint(self._last)
-        p.end()
-        self.canvas.update()
+    A single QPainter stays open for the whole stroke.  The points added
+    since the last flush are drawn with one drawPolyline() call every
+    FLUSH_POINTS points, or on the next timer tick if the mouse pauses.
+    """
 
-    def mouse_move(self, event):
-        if self._last is None:
+    FLUSH_POINTS = 16
+    FLUSH_MS = 16
+
+    def __init__(self, canvas):
+        self.canvas = canvas
+        self._painter = None
+        # Last drawn point followed by the points not yet drawn
+        self._points = []
+        self._timer = QTimer()
+        self._timer.setSingleShot(True)
+        self._timer.setInterval(self.FLUSH_MS)
+        self._timer.timeout.connect(self.flush)
+
+    @property
+    def active(self):
+        return self._painter is not None
+
+    def begin(self, painter, pos):
+        """Start a stroke at *pos*, drawing with the configured *painter*."""
+        self._points = [QPointF(pos)]
+        self._painter = painter
+        self._painter.drawPoint(pos)
+        self._update_rect(QRect(pos, pos))
+
+    def add_point(self, pos):
+        if self._painter is None:
             return
-        p = self.canvas.make_painter()
-        color = self.canvas.fg_color if event.buttons() & Qt.LeftButton else self.canvas.bg_color
-        p.setPen(QPen(color, 1, Qt.SolidLine, Qt.RoundCap))
-        p.drawLine(self._last, event.pos())
-        p.end()
-        self._last = event.pos()
-        self.canvas.update()
+        self._points.append(QPointF(pos))
+        if len(self._points) > self.FLUSH_POINTS:
+            self.flush()
+        elif not self._timer.isActive():
+            self._timer.start()
+
+    def flush(self):
+        """Draw the points collected since the last flush."""
+        self._timer.stop()
+        if self._painter is None or len(self._points) < 2:
+            return
+        # Starts at the last drawn point so the segments join up
+        line = QPolygonF(self._points)
+        self._painter.drawPolyline(line)
+        self._points = self._points[-1:]
+        self._update_rect(line.boundingRect().toAlignedRect())
+
+    def _update_rect(self, rect):
+        """Repaint only the canvas area touched by the pen."""
+        m = self._painter.pen().width() // 2 + 2
+        self.canvas.update_canvas_rect(rect.adjusted(-m, -m, m, m))
+
+    def end(self):
+        if self._painter is None:
+            return
+        self.flush()
+        self._painter.end()
+        self._painter = None
 
-    def mouse_release(self, event):
-        self._last = None
-        self.canvas.set_modified()
 
+class BaseStrokeTool(BaseTool):
+    """Freehand tool that paints a stroke following the mouse.
 
-class BrushTool(BaseTool):
-    name = "Brush"
+    Subclasses tweak the stroke through the CAP/JOIN/COMPOSITION class
+    attributes and the _pen_color()/_pen_width() hooks; pressing, moving
+    and releasing are shared.
+    """
+
+    CAP = Qt.RoundCap
+    JOIN = Qt.RoundJoin
+    COMPOSITION = None
 
     def __init__(self, canvas):
         super().__init__(canvas)
-        self._last = None
+        self._stroke = _StrokeBatch(canvas)
+
+    def _pen_color(self, event):
+        if event.button() == Qt.LeftButton:
+            return self.canvas.fg_color
+        return self.canvas.bg_color
+
+    def _pen_width(self):
+        return self.canvas.brush_size
+
+    def _make_pen(self, event):
+        return _pen(self._pen_color(event).rgba(), self._pen_width(),
+                    self.CAP, self.JOIN)
+
+    def _make_painter(self):
+        p = self.canvas.make_painter()
+        if self.COMPOSITION is not None:
+            p.setCompositionMode(self.COMPOSITION)
+        return p
 
     def mouse_press(self, event):
         self.canvas.save_undo()
-        self._last = event.pos()
-        p = self.canvas.make_painter()
-        color = self.canvas.fg_color if event.button() == Qt.LeftButton else self.canvas.bg_color
-        size = self.canvas.brush_size
-        p.setPen(QPen(color, size, Qt.SolidLine, Qt.RoundCap, Qt.RoundJoin))
-        p.drawPoint(self._last)
-        p.end()
-        self.canvas.update()
+        p = self._make_painter()
+        p.setPen(self._make_pen(event))
+        self._stroke.begin(p, event.pos())
 
     def mouse_move(self, event):
-        if self._last is None:
-            return
-        p = self.canvas.make_painter()
-        color = self.canvas.fg_color if event.buttons() & Qt.LeftButton else self.canvas.bg_color
-        size = self.canvas.brush_size
-        p.setPen(QPen(color, size, Qt.SolidLine, Qt.RoundCap, Qt.RoundJoin))
-        p.drawLine(self._last, event.pos())
-        p.end()
-        self._last = event.pos()
-        self.canvas.update()
+        self._stroke.add_point(event.pos())
 
     def mouse_release(self, event):
-        self._last = None
+        self._stroke.end()
         self.canvas.set_modified()
 
+    def deactivate(self):
+        self._stroke.end()
 
-class EraserTool(BaseTool):
-    name = "Eraser"
+    def end_stroke(self):
+        # The rest of the drag is ignored: add_point() needs an open stroke
+        self._stroke.end()
 
-    def __init__(self, canvas):
-        super().__init__(canvas)
-        self._last = None
 
-    def mouse_press(self, event):
-        self.canvas.save_undo()
-        self._last = event.pos()
-        p = self.canvas.make_painter()
-        size = self.canvas.brush_size
-        p.setPen(QPen(self.canvas.bg_color, size, Qt.SolidLine, Qt.RoundCap, Qt.RoundJoin))
-        p.drawPoint(self._last)
-        p.end()
-        self.canvas.update()
+class PencilTool(BaseStrokeTool):
+    name = "Pencil"
+    JOIN = Qt.BevelJoin
 
-    def mouse_move(self, event):
-        if self._last is None:
-            return
-        p = self.canvas.make_painter()
-        size = self.canvas.brush_size
-        p.setPen(QPen(self.canvas.bg_color, size, Qt.SolidLine, Qt.RoundCap, Qt.RoundJoin))
-        p.drawLine(self._last, event.pos())
-        p.end()
-        self._last = event.pos()
-        self.canvas.update()
+    def _pen_width(self):
+        return 1
 
-    def mouse_release(self, event):
-        self._last = None
-        self.canvas.set_modified()
 
-    def get_cursor(self):
-        return Qt.CrossCursor
+class BrushTool(BaseStrokeTool):
+    name = "Brush"
+
+
+class EraserTool(BaseStrokeTool):
+    name = "Eraser"
+
+    def _pen_color(self, event):
+        return self.canvas.bg_color
 
 
-class AlphaBrushTool(BaseTool):
+class AlphaBrushTool(BaseStrokeTool):
     """Brush that erases pixels to transparent."""
     name = "Alpha"
+    COMPOSITION = QPainter.CompositionMode_Clear
 
-    def __init__(self, canvas):
-        super().__init__(canvas)
-        self._last = None
+    def _pen_color(self, event):
+        return QColor(Qt.transparent)
 
     def _make_painter(self):
-        p = QPainter(self.canvas.pixmap)
-        p.setCompositionMode(QPainter.CompositionMode_Clear)
-        size = self.canvas.brush_size
-        p.setPen(QPen(Qt.transparent, size, Qt.SolidLine, Qt.RoundCap, Qt.RoundJoin))
+        # Not antialiased: soft edges would leave half-cleared pixels
+        p = QPainter(self.canvas.image)
+        p.setCompositionMode(self.COMPOSITION)
         return p
 
     def mouse_press(self, event):
-        self.canvas.save_undo()
-        pos = event.pos()
         if event.modifiers() & Qt.ShiftModifier:
-            self._alpha_flood_fill(pos)
+            self.canvas.save_undo()
+            self._alpha_flood_fill(event.pos())
             return
-        self._last = pos
-        p = self._make_painter()
-        p.drawPoint(self._last)
-        p.end()
-        self.canvas.update()
+        super().mouse_press(event)
 
     def _alpha_flood_fill(self, pos):
-        img = self.canvas.pixmap.toImage()
+        img = self.canvas.image
         w, h = img.width(), img.height()
         if pos.x() < 0 or pos.x() >= w or pos.y() < 0 or pos.y() >= h:
             return
         target = img.pixelColor(pos)
         if target.alpha() == 0:
             return
-        target_rgb = target.rgba()
-        fill = QColor(0, 0, 0, 0)
-        queue = deque()
-        queue.append((pos.x(), pos.y()))
-        visited = set()
-        visited.add((pos.x(), pos.y()))
-        while queue:
-            cx, cy = queue.popleft()
-            if img.pixelColor(cx, cy).rgba() != target_rgb:
-                continue
-            img.setPixelColor(cx, cy, fill)
-            for nx, ny in ((cx - 1, cy), (cx + 1, cy), (cx, cy - 1), (cx, cy + 1)):
-                if 0 <= nx < w and 0 <= ny < h and (nx, ny) not in visited:
-                    visited.add((nx, ny))
-                    queue.append((nx, ny))
-        self.canvas.pixmap = QPixmap.fromImage(img)
-        self.canvas.update()
-        self.canvas.set_modified()
-
-    def mouse_move(self, event):
-        if self._last is None:
-            return
-        p = self._make_painter()
-        p.drawLine(self._last, event.pos())
-        p.end()
-        self._last = event.pos()
-        self.canvas.update()
-
-    def mouse_release(self, event):
-        self._last = None
+        if np is not None:
+            dirty = _scanline_fill(self.canvas.pixels(), pos.x(), pos.y(), 0)
+        else:
+            dirty = _queue_fill(img, pos.x(), pos.y(), 0)
+        if dirty is not None:
+            self.canvas.update_canvas_rect(dirty)
         self.canvas.set_modified()
 
 
@@ -306,24 +645,43 @@ class LineTool(BaseTool):
         self._start = None
         self._end = None
         self._color = None
+        self._pen = None
+        canvas.brush_size_changed.connect(self._on_brush_size_changed)
+
+    def _update_style(self):
+        self._pen = _pen(self._color.rgba(), self.canvas.brush_size, Qt.RoundCap)
+
+    def _on_brush_size_changed(self, size):
+        if self._start is not None:
+            self._update_style()
 
     def mouse_press(self, event):
         self.canvas.save_undo()
         self._start = event.pos()
         self._end = event.pos()
         self._color = self.canvas.fg_color if event.button() == Qt.LeftButton else self.canvas.bg_color
+        self._update_style()
 
     def mouse_move(self, event):
         if self._start is None:
             return
+        old = self._dirty_rect()
         self._end = event.pos()
-        self.canvas.update()
+        self.canvas.update_canvas_rect(old | self._dirty_rect())
+
+    def _dirty_rect(self):
+        """Canvas area covered by the preview, including the pen width."""
+        m = self.canvas.brush_size // 2 + 2
+        s, e = self._start, self._end
+        return QRect(min(s.x(), e.x()) - m, min(s.y(), e.y()) - m,
+                     abs(e.x() - s.x()) + 2 * m + 1,
+                     abs(e.y() - s.y()) + 2 * m + 1)
 
     def mouse_release(self, event):
         if self._start is None:
             return
         p = self.canvas.make_painter()
-        p.setPen(QPen(self._color, self.canvas.brush_size, Qt.SolidLine, Qt.RoundCap))
+        p.setPen(self._pen)
         p.drawLine(self._start, self._end)
         p.end()
         self._start = None
@@ -333,7 +691,7 @@ class LineTool(BaseTool):
 
     def paint_overlay(self, painter):
         if self._start is not None and self._end is not None:
-            painter.setPen(QPen(self._color, self.canvas.brush_size, Qt.SolidLine, Qt.RoundCap))
+            painter.setPen(self._pen)
             painter.drawLine(self._start, self._end)
 
 
@@ -345,21 +703,48 @@ class RectangleTool(BaseTool):
         self._start = None
         self._end = None
         self._color = None
+        self._pen = None
+        self._brush = None
+        canvas.brush_size_changed.connect(self._on_brush_size_changed)
 
     def _rect(self):
-        return QRect(self._start, self._end).normalized()
+        s, e = self._start, self._end
+        return QRect(min(s.x(), e.x()), min(s.y(), e.y()),
+                     abs(e.x() - s.x()) + 1, abs(e.y() - s.y()) + 1)
+
+    def _update_style(self):
+        """Pick the pen and brush for the current fill mode, once per drag."""
+        mode = self.canvas.shape_fill_mode
+        pen = _pen(self._color.rgba(), self.canvas.brush_size)
+        if mode == ShapeFillMode.OUTLINE:
+            self._pen, self._brush = pen, Qt.NoBrush
+        elif mode == ShapeFillMode.FILLED:
+            self._pen, self._brush = Qt.NoPen, _brush(self._color.rgba())
+        else:  # BOTH
+            self._pen, self._brush = pen, _brush(self.canvas.bg_color.rgba())
+
+    def _on_brush_size_changed(self, size):
+        if self._start is not None:
+            self._update_style()
 
     def mouse_press(self, event):
         self.canvas.save_undo()
         self._start = event.pos()
         self._end = event.pos()
         self._color = self.canvas.fg_color if event.button() == Qt.LeftButton else self.canvas.bg_color
+        self._update_style()
 
     def mouse_move(self, event):
         if self._start is None:
             return
+        old = self._dirty_rect()
         self._end = event.pos()
-        self.canvas.update()
+        self.canvas.update_canvas_rect(old | self._dirty_rect())
+
+    def _dirty_rect(self):
+        """Canvas area covered by the preview, including the pen width."""
+        m = self.canvas.brush_size // 2 + 2
+        return self._rect().adjusted(-m, -m, m, m)
 
     def mouse_release(self, event):
         if self._start is None:
@@ -373,17 +758,8 @@ class RectangleTool(BaseTool):
         self.canvas.set_modified()
 
     def _draw_shape(self, painter):
-        mode = self.canvas.shape_fill_mode
-        pen = QPen(self._color, self.canvas.brush_size)
-        if mode == ShapeFillMode.OUTLINE:
-            painter.setPen(pen)
-            painter.setBrush(Qt.NoBrush)
-        elif mode == ShapeFillMode.FILLED:
-            painter.setPen(Qt.NoPen)
-            painter.setBrush(QBrush(self._color))
-        else:  # BOTH
-            painter.setPen(pen)
-            painter.setBrush(QBrush(self.canvas.bg_color))
+        painter.setPen(self._pen)
+        painter.setBrush(self._brush)
         painter.drawRect(self._rect())
 
     def paint_overlay(self, painter):
@@ -399,21 +775,48 @@ class EllipseTool(BaseTool):
         self._start = None
         self._end = None
         self._color = None
+        self._pen = None
+        self._brush = None
+        canvas.brush_size_changed.connect(self._on_brush_size_changed)
 
     def _rect(self):
-        return QRect(self._start, self._end).normalized()
+        s, e = self._start, self._end
+        return QRect(min(s.x(), e.x()), min(s.y(), e.y()),
+                     abs(e.x() - s.x()) + 1, abs(e.y() - s.y()) + 1)
+
+    def _update_style(self):
+        """Pick the pen and brush for the current fill mode, once per drag."""
+        mode = self.canvas.shape_fill_mode
+        pen = _pen(self._color.rgba(), self.canvas.brush_size)
+        if mode == ShapeFillMode.OUTLINE:
+            self._pen, self._brush = pen, Qt.NoBrush
+        elif mode == ShapeFillMode.FILLED:
+            self._pen, self._brush = Qt.NoPen, _brush(self._color.rgba())
+        else:  # BOTH
+            self._pen, self._brush = pen, _brush(self.canvas.bg_color.rgba())
+
+    def _on_brush_size_changed(self, size):
+        if self._start is not None:
+            self._update_style()
 
     def mouse_press(self, event):
         self.canvas.save_undo()
         self._start = event.pos()
         self._end = event.pos()
         self._color = self.canvas.fg_color if event.button() == Qt.LeftButton else self.canvas.bg_color
+        self._update_style()
 
     def mouse_move(self, event):
         if self._start is None:
             return
+        old = self._dirty_rect()
         self._end = event.pos()
-        self.canvas.update()
+        self.canvas.update_canvas_rect(old | self._dirty_rect())
+
+    def _dirty_rect(self):
+        """Canvas area covered by the preview, including the pen width."""
+        m = self.canvas.brush_size // 2 + 2
+        return self._rect().adjusted(-m, -m, m, m)
 
     def mouse_release(self, event):
         if self._start is None:
@@ -427,17 +830,8 @@ class EllipseTool(BaseTool):
         self.canvas.set_modified()
 
     def _draw_shape(self, painter):
-        mode = self.canvas.shape_fill_mode
-        pen = QPen(self._color, self.canvas.brush_size)
-        if mode == ShapeFillMode.OUTLINE:
-            painter.setPen(pen)
-            painter.setBrush(Qt.NoBrush)
-        elif mode == ShapeFillMode.FILLED:
-            painter.setPen(Qt.NoPen)
-            painter.setBrush(QBrush(self._color))
-        else:
-            painter.setPen(pen)
-            painter.setBrush(QBrush(self.canvas.bg_color))
+        painter.setPen(self._pen)
+        painter.setBrush(self._brush)
         painter.drawEllipse(self._rect())
 
     def paint_overlay(self, painter):
@@ -539,6 +933,8 @@ class TextTool(BaseTool):
     def __init__(self, canvas):
         super().__init__(canvas)
         self._font = QFont("Sans Serif", 16)
+        self._font_key = self._font.key()
+        self._metrics = QFontMetrics(self._font)
         self._pos = QPointF(0, 0)      # canvas-space top-left (float)
         self._text = ""
         self._active = False
@@ -546,9 +942,21 @@ class TextTool(BaseTool):
         self._font_bar = None          # _DraggableFontBar
         self._cached_pm = None         # cached rendered pixmap
         self._cache_key = None         # (text, font_key, fg_rgba)
+        self._line_cache = {}          # (line, font_key, fg_rgba) -> QPixmap
 
     # --- Rendering helper ---
 
+    def _set_font(self, font):
+        self._font = font
+        self._font_key = font.key()
+        self._metrics = QFontMetrics(font)
+
+    def _text_size(self):
+        """Return (width, height) of the current text in canvas pixels."""
+        lines = self._text.split('\n')
+        max_w = max(self._metrics.horizontalAdvance(ln) for ln in lines)
+        return max_w, self._metrics.height() * len(lines)
+
     def _render_text_pixmap(self):
         """Render current text to a transparent QPixmap at canvas resolution.
 
@@ -561,18 +969,10 @@ class TextTool(BaseTool):
             self._cache_key = None
             return None
         fg = self.canvas.fg_color
-        key = (self._text, self._font.key(), fg.rgba())
+        key = (self._text, self._font_key, fg.rgba())
         if self._cache_key == key and self._cached_pm is not None:
             return self._cached_pm
-        dummy = QPixmap(1, 1)
-        p_tmp = QPainter(dummy)
-        p_tmp.setFont(self._font)
-        metrics = p_tmp.fontMetrics()
-        lines = self._text.split('\n')
-        max_w = max(metrics.horizontalAdvance(ln) for ln in lines) if lines else 1
-        line_h = metrics.height()
-        total_h = line_h * len(lines)
-        p_tmp.end()
+        max_w, total_h = self._text_size()
         if max_w < 1 or total_h < 1:
             self._cached_pm = None
             self._cache_key = None
@@ -580,25 +980,48 @@ class TextTool(BaseTool):
         pm = QPixmap(max_w + 1, total_h + 1)
         pm.fill(Qt.transparent)
         p = QPainter(pm)
+        line_h = self._metrics.height()
+        pad = self._LINE_PAD
+        # Only lines whose text changed are re-rasterized; the cache keeps
+        # just the lines currently in use.
+        old_cache, self._line_cache = self._line_cache, {}
+        for i, line in enumerate(self._text.split('\n')):
+            if not line:
+                continue
+            line_key = (line, self._font_key, fg.rgba())
+            line_pm = old_cache.get(line_key) or self._render_line(line, fg)
+            self._line_cache[line_key] = line_pm
+            p.drawPixmap(-pad, i * line_h - pad, line_pm)
+        p.end()
+        self._cached_pm = pm
+        self._cache_key = key
+        return pm
+
+    # Margin around each cached line so glyphs that overhang the line box
+    # (italics, accents) are not clipped before being composed.
+    _LINE_PAD = 8
+
+    def _render_line(self, line, fg):
+        """Rasterize a single line of text, offset by _LINE_PAD."""
+        pad = self._LINE_PAD
+        pm = QPixmap(self._metrics.horizontalAdvance(line) + 2 * pad + 1,
+                     self._metrics.height() + 2 * pad + 1)
+        pm.fill(Qt.transparent)
+        p = QPainter(pm)
         p.setRenderHint(QPainter.TextAntialiasing)
         p.setFont(self._font)
         p.setPen(fg)
-        y = metrics.ascent()
-        for line in lines:
-            p.drawText(QPointF(0, y), line)
-            y += line_h
+        p.drawText(QPointF(pad, pad + self._metrics.ascent()), line)
         p.end()
-        self._cached_pm = pm
-        self._cache_key = key
         return pm
 
     def _text_rect(self):
         """Return the canvas-space QRectF occupied by the current text."""
-        pm = self._render_text_pixmap()
-        if pm is None:
+        w, h = self._text_size() if self._text else (0, 0)
+        if w < 1 or h < 1:
             h = self._font.pointSizeF() * 1.5 + 4
             return QRectF(self._pos.x(), self._pos.y(), 100.0, h)
-        return QRectF(self._pos.x(), self._pos.y(), pm.width(), pm.height())
+        return QRectF(self._pos.x(), self._pos.y(), w + 1, h + 1)
 
     # --- Widget management ---
 
@@ -700,7 +1123,7 @@ class TextTool(BaseTool):
     def _choose_font(self):
         font, ok = QFontDialog.getFont(self._font, self.canvas)
         if ok:
-            self._font = font
+            self._set_font(font)
             if self._font_bar:
                 self._font_bar.set_label(f"{font.family()}, {font.pointSize()}pt")
             self._sync_editor_style()
@@ -740,7 +1163,7 @@ class TextTool(BaseTool):
             self.canvas.save_undo()
             pm = self._render_text_pixmap()
             if pm:
-                p = QPainter(self.canvas.pixmap)
+                p = QPainter(self.canvas.image)
                 p.drawPixmap(QPointF(self._pos.x(), self._pos.y()), pm)
                 p.end()
                 self.canvas.set_modified()
@@ -781,36 +1204,26 @@ class FillTool(BaseTool):
 
     def mouse_press(self, event):
         pos = event.pos()
-        img = self.canvas.pixmap.toImage()
+        img = self.canvas.image
         w, h = img.width(), img.height()
         if pos.x() < 0 or pos.x() >= w or pos.y() < 0 or pos.y() >= h:
             return
-        target = img.pixelColor(pos)
         fill_color = self.canvas.fg_color if event.button() == Qt.LeftButton else self.canvas.bg_color
-        if target == fill_color:
+        fill = _pixel_value(fill_color, img.format())
+        # Compare stored pixels: colours that differ only in the channels
+        # of a transparent pixel premultiply to the same value
+        if img.pixel(pos) == fill:
             return
         self.canvas.save_undo()
-        self._flood_fill(img, pos.x(), pos.y(), target, fill_color, w, h)
-        self.canvas.pixmap = QPixmap.fromImage(img)
-        self.canvas.update()
-        self.canvas.set_modified()
-
-    @staticmethod
-    def _flood_fill(img, x, y, target, fill, w, h):
-        target_rgb = target.rgba()
-        queue = deque()
-        queue.append((x, y))
-        visited = set()
-        visited.add((x, y))
-        while queue:
-            cx, cy = queue.popleft()
-            if img.pixelColor(cx, cy).rgba() != target_rgb:
-                continue
-            img.setPixelColor(cx, cy, fill)
-            for nx, ny in ((cx - 1, cy), (cx + 1, cy), (cx, cy - 1), (cx, cy + 1)):
-                if 0 <= nx < w and 0 <= ny < h and (nx, ny) not in visited:
-                    visited.add((nx, ny))
-                    queue.append((nx, ny))
+        if np is not None:
+            dirty = _scanline_fill(self.canvas.pixels(), pos.x(), pos.y(), fill)
+        else:
+            dirty = _queue_fill(img, pos.x(), pos.y(), fill)
+        # Nothing filled: the unchanged snapshot is dropped by the next
+        # save_undo() or undo(), see _push_pending_undo()
+        if dirty is not None:
+            self.canvas.update_canvas_rect(dirty)
+            self.canvas.set_modified()
 
     def get_cursor(self):
         return Qt.CrossCursor
@@ -821,7 +1234,7 @@ class PickerTool(BaseTool):
 
     def mouse_press(self, event):
         pos = event.pos()
-        img = self.canvas.pixmap.toImage()
+        img = self.canvas.image
         if 0 <= pos.x() < img.width() and 0 <= pos.y() < img.height():
             color = QColor(img.pixelColor(pos))
             if event.button() == Qt.LeftButton:
@@ -838,12 +1251,20 @@ class SelectionTool(BaseTool):
     """Rectangular selection with resize handles and rotation."""
 
     name = "Selection"
+    supports_selection = True
 
+    MIP_MIN_SIZE = 8  # smallest side of the last snippet mip level
     _HANDLE_NAMES = ("nw", "n", "ne", "e", "se", "s", "sw", "w")
     _OPPOSITE = {
         "nw": "se", "n": "s", "ne": "sw", "e": "w",
         "se": "nw", "s": "n", "sw": "ne", "w": "e",
     }
+    _HIT_NAMES = _HANDLE_NAMES + ("rotate",)  # order of _handle_xy rows
+    # Handle direction in 45-degree steps, modulo the 4 resize cursors
+    _HANDLE_STEPS = {"n": 0, "ne": 1, "e": 2, "se": 3,
+                     "s": 0, "sw": 1, "w": 2, "nw": 3}
+    _RESIZE_CURSORS = (Qt.SizeVerCursor, Qt.SizeBDiagCursor,
+                       Qt.SizeHorCursor, Qt.SizeFDiagCursor)
     _CHANGES_X = {"nw", "ne", "sw", "se", "e", "w"}
     _CHANGES_Y = {"nw", "ne", "sw", "se", "n", "s"}
 
@@ -854,13 +1275,23 @@ class SelectionTool(BaseTool):
         self._rect = QRect()
         self._snippet = None       # QPixmap of selected area
         self._snippet_display = None  # snippet composited over checkerboard
+        self._snippet_mips = None  # halving chains of the two pixmaps above,
+        self._display_mips = None  # used for downscaled drawing
+        self._snippet_opaque = False  # no pixel of _snippet has alpha < 255
         self._angle = 0.0          # rotation in degrees
         self._move_offset = None
         self._active_handle = None
         self._resize_anchor = None  # QPointF, fixed point during resize
+        self._resize_axes = (False, False)  # handle moves (width, height)
         self._drag_start_rect = None
         self._drag_start_angle = None
         self._drag_start_sel_angle = None
+        # Handle positions cached per (rect, angle, zoom); see _update_handles
+        self._handle_key = None
+        self._handles = {}
+        self._handle_xy = None     # (9, 2) float32 array when NumPy is present
+        self._rotation_angle = 0.0
+        self._rotation_cs = (1.0, 0.0)  # cos/sin of _rotation_angle
 
     def activate(self):
         self._reset()
@@ -875,6 +1306,9 @@ class SelectionTool(BaseTool):
         self._rect = QRect()
         self._snippet = None
         self._snippet_display = None
+        self._snippet_mips = None
+        self._display_mips = None
+        self._snippet_opaque = False
         self._angle = 0.0
         self._move_offset = None
         self._active_handle = None
@@ -890,56 +1324,108 @@ class SelectionTool(BaseTool):
             sw, sh = self._snippet.width(), self._snippet.height()
             self._snippet_display = QPixmap(sw, sh)
             tp = QPainter(self._snippet_display)
-            tp.drawTiledPixmap(0, 0, sw, sh, self.canvas._checker_tile)
+            tp.fillRect(0, 0, sw, sh, self.canvas._checker_brush)
             tp.drawPixmap(0, 0, self._snippet)
             tp.end()
+            self._snippet_mips = self._mip_chain(self._snippet)
+            self._display_mips = self._mip_chain(self._snippet_display)
+            self._snippet_opaque = _is_opaque(self._snippet.toImage())
         else:
             self._snippet_display = None
+            self._snippet_mips = self._display_mips = None
+            self._snippet_opaque = False
 
-    # --- Geometry helpers ---
+    @classmethod
+    def _mip_chain(cls, pixmap):
+        """Return [pixmap, pixmap/2, pixmap/4, ...] down to MIP_MIN_SIZE px.
+
+        Each level is a smooth (box-filtered) half of the previous one, so
+        the whole chain costs about a third more memory than *pixmap*.
+        """
+        mips = [pixmap]
+        level = pixmap
+        while min(level.width(), level.height()) // 2 >= cls.MIP_MIN_SIZE:
+            level = level.scaled(level.width() // 2, level.height() // 2,
+                                 Qt.IgnoreAspectRatio, Qt.SmoothTransformation)
+            mips.append(level)
+        return mips
 
     @staticmethod
-    def _rotate_point(point, center, angle_deg):
-        """Rotate a QPointF around center by angle_deg degrees."""
-        rad = math.radians(angle_deg)
-        cos_a, sin_a = math.cos(rad), math.sin(rad)
-        dx = point.x() - center.x()
-        dy = point.y() - center.y()
-        return QPointF(center.x() + dx * cos_a - dy * sin_a,
-                       center.y() + dx * sin_a + dy * cos_a)
+    def _pick_mip(mips, w, h):
+        """Return the smallest level of *mips* still at least w x h."""
+        sw, sh = mips[0].width(), mips[0].height()
+        scale = max(w / float(sw), h / float(sh))
+        if scale >= 1.0:
+            return mips[0]
+        level = int(math.floor(-math.log2(scale)))
+        return mips[min(level, len(mips) - 1)]
+
+    # --- Geometry helpers ---
+
+    def _rotation(self):
+        """Return (cos, sin) of the selection angle, cached per angle."""
+        if self._rotation_angle != self._angle:
+            rad = math.radians(self._angle)
+            self._rotation_cs = (math.cos(rad), math.sin(rad))
+            self._rotation_angle = self._angle
+        return self._rotation_cs
 
     def _get_handle_positions(self):
-        """Return dict of handle_name -> QPointF in canvas coords."""
+        """Return dict of handle_name -> QPointF in canvas coords.
+
+        The dict is cached and shared between calls; treat it as read-only.
+        """
+        self._update_handles()
+        return self._handles
+
+    def _update_handles(self):
+        """Recompute the handle positions if the rect, angle or zoom moved."""
+        key = (self._rect.getRect(), self._angle, self.canvas.zoom)
+        if key == self._handle_key:
+            return
+        self._handle_key = key
+        self._handles = self._compute_handle_positions()
+        if np is not None and self._handles:
+            self._handle_xy = np.array(
+                [(p.x(), p.y()) for p in self._handles.values()],
+                dtype=np.float32)
+        else:
+            self._handle_xy = None
+
+    def _compute_handle_positions(self):
         if self._rect.width() < 2 or self._rect.height() < 2:
             return {}
         r = QRectF(self._rect)
         center = r.center()
+        cx, cy = center.x(), center.y()
         hw, hh = r.width() / 2, r.height() / 2
-        local = {
-            "nw": QPointF(-hw, -hh), "n": QPointF(0, -hh), "ne": QPointF(hw, -hh),
-            "e": QPointF(hw, 0),
-            "se": QPointF(hw, hh), "s": QPointF(0, hh), "sw": QPointF(-hw, hh),
-            "w": QPointF(-hw, 0),
-        }
         rot_off = 20 / self.canvas.zoom if self.canvas.zoom > 0 else 20
-        local["rotate"] = QPointF(0, -hh - rot_off)
-        positions = {}
-        for name, lp in local.items():
-            positions[name] = self._rotate_point(
-                QPointF(center.x() + lp.x(), center.y() + lp.y()),
-                center, self._angle)
-        return positions
+        local = (
+            ("nw", -hw, -hh), ("n", 0, -hh), ("ne", hw, -hh), ("e", hw, 0),
+            ("se", hw, hh), ("s", 0, hh), ("sw", -hw, hh), ("w", -hw, 0),
+            ("rotate", 0, -hh - rot_off),
+        )
+        cos_a, sin_a = self._rotation()
+        return {name: QPointF(cx + dx * cos_a - dy * sin_a,
+                              cy + dx * sin_a + dy * cos_a)
+                for name, dx, dy in local}
 
     def _hit_handle(self, pos):
         """Return handle name if pos is near a handle, else None."""
         if self._state not in ("selected", "moving"):
             return None
-        positions = self._get_handle_positions()
+        self._update_handles()
         thr = max(6, 8 / self.canvas.zoom)
         thr_sq = thr * thr
-        pf = QPointF(pos.x(), pos.y())
-        for name, hp in positions.items():
-            dx, dy = pf.x() - hp.x(), pf.y() - hp.y()
+        px, py = pos.x(), pos.y()
+        if self._handle_xy is not None:
+            # Nearest handle within the threshold, in one vectorised pass
+            diff = self._handle_xy - np.array((px, py), dtype=np.float32)
+            d2 = np.einsum("ij,ij->i", diff, diff)
+            i = int(d2.argmin())
+            return self._HIT_NAMES[i] if d2[i] < thr_sq else None
+        for name, hp in self._handles.items():
+            dx, dy = px - hp.x(), py - hp.y()
             if dx * dx + dy * dy < thr_sq:
                 return name
         return None
@@ -949,23 +1435,20 @@ class SelectionTool(BaseTool):
         if self._rect.width() < 2 or self._rect.height() < 2:
             return False
         center = QPointF(self._rect.center())
-        local = self._rotate_point(QPointF(pos.x(), pos.y()), center, -self._angle)
-        return QRectF(self._rect).contains(local)
+        cos_a, sin_a = self._rotation()
+        # Rotate pos by -angle about the centre, into the unrotated rect
+        dx, dy = pos.x() - center.x(), pos.y() - center.y()
+        return QRectF(self._rect).contains(QPointF(center.x() + dx * cos_a + dy * sin_a,
+                                  center.y() - dx * sin_a + dy * cos_a))
 
     def _cursor_for_handle(self, handle):
         """Return appropriate resize/rotate cursor for a handle."""
         if handle == "rotate":
             return Qt.PointingHandCursor
-        base = {"n": 0, "ne": 45, "e": 90, "se": 135,
-                "s": 180, "sw": 225, "w": 270, "nw": 315}
-        total = (base[handle] + self._angle) % 360
-        if total < 0:
-            total += 360
-        cursors = [Qt.SizeVerCursor, Qt.SizeBDiagCursor,
-                   Qt.SizeHorCursor, Qt.SizeFDiagCursor,
-                   Qt.SizeVerCursor, Qt.SizeBDiagCursor,
-                   Qt.SizeHorCursor, Qt.SizeFDiagCursor]
-        return cursors[int((total + 22.5) / 45) % 8]
+        # Handles sit on 45-degree steps, so only the selection angle needs
+        # rounding to the nearest step
+        step = int((self._angle % 360 + 22.5) / 45)
+        return self._RESIZE_CURSORS[(self._HANDLE_STEPS[handle] + step) % 4]
 
     def cursor_at(self, pos):
         """Return the cursor for the given canvas-space position."""
@@ -985,58 +1468,67 @@ class SelectionTool(BaseTool):
 
     @staticmethod
     def _snap_alpha(pixmap):
-        """Snap every pixel's alpha to 0 (was 0) or 255 (was >0)."""
+        """Snap every pixel's alpha to 0 (was 0) or 255 (was >0).
+
+        The snap runs on straight ARGB32 so partly transparent pixels keep
+        their full colour.  Once every alpha is 0 or 255 the bytes are also
+        valid premultiplied pixels, so the result is handed back in
+        CANVAS_FORMAT without a second conversion.
+        """
         img = pixmap.toImage().convertToFormat(QImage.Format_ARGB32)
-        ptr = img.bits()
-        ptr.setsize(img.height() * img.bytesPerLine())
-        data = bytearray(ptr)
-        bpl = img.bytesPerLine()
-        w_bytes = img.width() * 4
-        for y in range(img.height()):
-            base = y * bpl
-            for x in range(3, w_bytes, 4):
-                i = base + x
-                if data[i] == 0:
-                    data[i-3] = data[i-2] = data[i-1] = 0
-                else:
-                    data[i] = 255
-        return QPixmap.fromImage(
-            QImage(bytes(data), img.width(), img.height(),
-                   bpl, QImage.Format_ARGB32))
+        if np is not None:
+            # Snap in place through a uint32 view of the image buffer
+            arr = _image_array(img)
+            if _snap_alpha_jit is not None:
+                _snap_alpha_jit(arr, arr)
+            else:
+                clear = arr < 0x01000000          # alpha == 0
+                arr |= np.uint32(0xFF000000)
+                arr[clear] = 0
+        else:
+            # SWAR over the whole buffer as one native-order int, one
+            # 32-bit lane per pixel, so every step is a C bigint op.
+            ptr = img.bits()
+            ptr.setsize(img.sizeInBytes())
+            n = img.sizeInBytes() // 4
+            lanes = int.from_bytes(ptr, sys.byteorder)
+            low = int.from_bytes(b'\xff\0\0\0' * n, 'little')
+            one = int.from_bytes(b'\x01\0\0\0' * n, 'little')
+            alpha = (lanes >> 24) & low
+            opaque = ((alpha + low) >> 8) & one   # carries out iff alpha > 0
+            keep = opaque * 0xFFFFFFFF
+            lanes = (lanes | (low << 24)) & keep
+            ptr[:] = lanes.to_bytes(n * 4, sys.byteorder)
+        img.reinterpretAsFormat(CANVAS_FORMAT)
+        return QPixmap.fromImage(img)
 
     def _render_rotated(self, w, h, source=None):
-        """Render snippet scaled to w*h and rotated, with 2x supersampling.
+        """Render snippet scaled to w*h and rotated in one smooth pass.
 
         Returns a QPixmap containing the rotated result (bounding-box sized,
         transparent corners).  Centre of the returned pixmap corresponds to
         the centre of the target rectangle.
         If *source* is given it is drawn instead of self._snippet.
         """
-        src = source if source is not None else self._snippet
-        sw, sh = src.width(), src.height()
-        SS = 2  # supersample factor
-        t_rot = QTransform().rotate(self._angle)
-        rotated_bbox = t_rot.mapRect(QRectF(-w / 2.0, -h / 2.0, w, h))
-        buf_w = int(math.ceil(abs(rotated_bbox.width()) * SS)) + 4
-        buf_h = int(math.ceil(abs(rotated_bbox.height()) * SS)) + 4
-        tmp = QPixmap(buf_w, buf_h)
-        tmp.fill(Qt.transparent)
-        tp = QPainter(tmp)
-        tp.setRenderHint(QPainter.SmoothPixmapTransform)
-        tp.setRenderHint(QPainter.Antialiasing)
-        tp.translate(buf_w / 2.0, buf_h / 2.0)
-        tp.rotate(self._angle)
-        tp.scale(w * SS / float(sw), h * SS / float(sh))
-        tp.translate(-sw / 2.0, -sh / 2.0)
-        tp.drawPixmap(0, 0, src)
-        tp.end()
-        out_w = int(math.ceil(abs(rotated_bbox.width()))) + 2
-        out_h = int(math.ceil(abs(rotated_bbox.height()))) + 2
-        return tmp.scaled(out_w, out_h, Qt.IgnoreAspectRatio,
-                          Qt.SmoothTransformation)
+        if source is not None:
+            src = source
+        elif self._snippet_mips:
+            src = self._pick_mip(self._snippet_mips, w, h)
+        else:
+            src = self._snippet
+        img = src.toImage()
+        sw, sh = img.width(), img.height()
+        if 2 * w < sw or 2 * h < sh:
+            # Big downscale: box-filter to twice the target size first so
+            # the bilinear pass below does not skip source pixels
+            img = img.scaled(min(sw, 2 * w), min(sh, 2 * h),
+                             Qt.IgnoreAspectRatio, Qt.SmoothTransformation)
+            sw, sh = img.width(), img.height()
+        t = QTransform().rotate(self._angle).scale(w / float(sw), h / float(sh))
+        return QPixmap.fromImage(img.transformed(t, Qt.SmoothTransformation))
 
     def _commit(self):
-        """Stamp the (possibly transformed) snippet back onto the pixmap."""
+        """Stamp the (possibly transformed) snippet back onto the canvas."""
         if not (self._snippet and not self._snippet.isNull()
                 and self._state in ("selected", "moving", "resizing", "rotating")):
             return
@@ -1045,76 +1537,94 @@ class SelectionTool(BaseTool):
         if abs(self._angle) < 0.01:
             # No rotation — single resample at most
             if w == self._snippet.width() and h == self._snippet.height():
-                scaled = self._snippet
-            else:
-                scaled = self._snap_alpha(
-                    self._snippet.scaled(w, h, Qt.IgnoreAspectRatio,
-                                         Qt.SmoothTransformation))
-            needed_w = self._rect.x() + w
-            needed_h = self._rect.y() + h
-            cur_w, cur_h = self.canvas.pixmap.width(), self.canvas.pixmap.height()
-            if needed_w > cur_w or needed_h > cur_h:
-                new_pm = QPixmap(max(cur_w, needed_w), max(cur_h, needed_h))
-                new_pm.fill(self.canvas.bg_color)
-                p = QPainter(new_pm)
+                self.canvas.grow_to(self._rect.x() + w, self._rect.y() + h)
+                p = QPainter(self.canvas.image)
                 p.setCompositionMode(QPainter.CompositionMode_Source)
-                p.drawPixmap(0, 0, self.canvas.pixmap)
-                p.drawPixmap(self._rect.topLeft(), scaled)
+                p.drawPixmap(self._rect.topLeft(), self._snippet)
                 p.end()
-                self.canvas.pixmap = new_pm
-                w_ = self.canvas.window()
-                if hasattr(w_, '_update_size_label'):
-                    w_._update_size_label()
             else:
-                p = QPainter(self.canvas.pixmap)
-                p.setCompositionMode(QPainter.CompositionMode_Source)
-                p.drawPixmap(self._rect.topLeft(), scaled)
-                p.end()
+                self._stamp_snapped(
+                    self._snippet.scaled(w, h, Qt.IgnoreAspectRatio,
+                                         Qt.SmoothTransformation),
+                    self._rect.x(), self._rect.y())
+        elif min(self._angle % 90.0, -self._angle % 90.0) < 0.01:
+            # Quarter turns — scale, then an exact pixel rotation; the
+            # result covers its rect exactly, so no clip path is needed
+            if w == self._snippet.width() and h == self._snippet.height():
+                scaled = self._snippet
+            else:
+                scaled = self._snippet.scaled(w, h, Qt.IgnoreAspectRatio,
+                                              Qt.SmoothTransformation)
+            turns = int(round(self._angle / 90.0)) % 4
+            result = scaled.transformed(QTransform().rotate(90 * turns))
+            dest_x = math.floor(r.center().x() - result.width() / 2.0 + 0.5)
+            dest_y = math.floor(r.center().y() - result.height() / 2.0 + 0.5)
+            self._stamp_snapped(result, dest_x, dest_y)
         else:
-            # With rotation — 2x supersample for high-quality interpolation
+            # With rotation — smooth single-pass transform
             result = self._snap_alpha(self._render_rotated(w, h))
             dest_x = r.center().x() - result.width() / 2.0
             dest_y = r.center().y() - result.height() / 2.0
             dest_pt = QPointF(dest_x, dest_y)
             # Clip path: rotated rectangle in canvas coordinates
             cx, cy = r.center().x(), r.center().y()
-            rad = math.radians(self._angle)
-            cos_a, sin_a = math.cos(rad), math.sin(rad)
-            clip = QPainterPath()
+            cos_a, sin_a = self._rotation()
             corners = [(-w / 2.0, -h / 2.0), (w / 2.0, -h / 2.0),
                        (w / 2.0, h / 2.0), (-w / 2.0, h / 2.0)]
-            first = True
-            for dx, dy in corners:
-                pt = QPointF(dx * cos_a - dy * sin_a + cx,
-                             dx * sin_a + dy * cos_a + cy)
-                if first:
-                    clip.moveTo(pt)
-                    first = False
-                else:
-                    clip.lineTo(pt)
+            clip = QPainterPath()
+            clip.addPolygon(QPolygonF(
+                [QPointF(dx * cos_a - dy * sin_a + cx,
+                         dx * sin_a + dy * cos_a + cy)
+                 for dx, dy in corners]))
             clip.closeSubpath()
-            needed_w = int(math.ceil(dest_x + result.width()))
-            needed_h = int(math.ceil(dest_y + result.height()))
-            cur_w, cur_h = self.canvas.pixmap.width(), self.canvas.pixmap.height()
-            if needed_w > cur_w or needed_h > cur_h:
-                new_pm = QPixmap(max(cur_w, needed_w), max(cur_h, needed_h))
-                new_pm.fill(self.canvas.bg_color)
-                p = QPainter(new_pm)
-                p.setCompositionMode(QPainter.CompositionMode_Source)
-                p.drawPixmap(0, 0, self.canvas.pixmap)
-                p.end()
-                self.canvas.pixmap = new_pm
-                w_ = self.canvas.window()
-                if hasattr(w_, '_update_size_label'):
-                    w_._update_size_label()
-            p = QPainter(self.canvas.pixmap)
-            p.setRenderHint(QPainter.Antialiasing, False)
-            p.setClipPath(clip)
-            p.setCompositionMode(QPainter.CompositionMode_Source)
-            p.drawPixmap(dest_pt, result)
-            p.end()
+            self._stamp(result, dest_pt, clip)
         self.canvas.update()
 
+    def _stamp_snapped(self, pixmap, x, y):
+        """Alpha-snap *pixmap* and write it into the canvas at (x, y).
+
+        Same result as stamping _snap_alpha(pixmap) in Source mode, but
+        with NumPy the snapped pixels are written straight into the canvas
+        buffer: no intermediate QPixmap and no separate blit pass.
+        """
+        if self._snippet_opaque:
+            # Smooth scaling and quarter turns of an opaque snippet stay
+            # opaque, so there is nothing to snap
+            self._stamp(pixmap, QPointF(x, y))
+            return
+        if np is None:
+            self._stamp(self._snap_alpha(pixmap), QPointF(x, y))
+            return
+        self.canvas.grow_to(x + pixmap.width(), y + pixmap.height())
+        img = pixmap.toImage().convertToFormat(QImage.Format_ARGB32)
+        dst = self.canvas.pixels()
+        ch, cw = dst.shape
+        x0, y0 = max(x, 0), max(y, 0)
+        x1, y1 = min(x + img.width(), cw), min(y + img.height(), ch)
+        if x0 >= x1 or y0 >= y1:
+            return
+        src = _image_array(img)[y0 - y:y1 - y, x0 - x:x1 - x]
+        dst = dst[y0:y1, x0:x1]
+        if _snap_alpha_jit is not None:
+            _snap_alpha_jit(src, dst)
+        else:
+            np.bitwise_or(src, np.uint32(0xFF000000), out=dst)
+            dst[src < 0x01000000] = 0
+
+    def _stamp(self, result, dest_pt, clip=None):
+        """Draw a transformed snippet at *dest_pt*, growing the canvas to
+        fit it if needed.  *clip* is an optional canvas-space QPainterPath.
+        """
+        self.canvas.grow_to(int(math.ceil(dest_pt.x() + result.width())),
+                            int(math.ceil(dest_pt.y() + result.height())))
+        p = QPainter(self.canvas.image)
+        p.setRenderHint(QPainter.Antialiasing, False)
+        if clip is not None:
+            p.setClipPath(clip)
+        p.setCompositionMode(QPainter.CompositionMode_Source)
+        p.drawPixmap(dest_pt, result)
+        p.end()
+
     # --- Mouse events ---
 
     def mouse_press(self, event):
@@ -1134,6 +1644,9 @@ class SelectionTool(BaseTool):
                 self._active_handle = handle
                 opp = self._OPPOSITE[handle]
                 self._resize_anchor = self._get_handle_positions()[opp]
+                # Resolve the handle's axes once per drag, not per move
+                self._resize_axes = (handle in self._CHANGES_X,
+                                     handle in self._CHANGES_Y)
                 self._drag_start_rect = QRectF(self._rect)
                 self._state = "resizing"
                 return
@@ -1156,33 +1669,33 @@ class SelectionTool(BaseTool):
         pos = event.pos()
         if self._state == "selecting":
             self._rect = QRect(self._start, pos).normalized()
-            self.canvas.update()
+            self.canvas.request_update()
         elif self._state == "moving" and self._move_offset is not None:
             nc = QPointF(pos.x(), pos.y()) - self._move_offset
             self._rect.moveCenter(QPoint(int(nc.x()), int(nc.y())))
-            self.canvas.update()
+            self.canvas.request_update()
         elif self._state == "resizing":
             self._do_resize(pos)
-            self.canvas.update()
+            self.canvas.request_update()
         elif self._state == "rotating":
             self._do_rotate(pos)
-            self.canvas.update()
+            self.canvas.request_update()
 
     def _do_resize(self, pos):
         anchor = self._resize_anchor
-        mouse = QPointF(pos.x(), pos.y())
-        rad = math.radians(self._angle)
-        cos_a, sin_a = math.cos(rad), math.sin(rad)
-        vx, vy = mouse.x() - anchor.x(), mouse.y() - anchor.y()
+        cos_a, sin_a = self._rotation()
+        vx, vy = pos.x() - anchor.x(), pos.y() - anchor.y()
         proj_x = vx * cos_a + vy * sin_a
         proj_y = -vx * sin_a + vy * cos_a
-        handle = self._active_handle
-        orig_w = self._drag_start_rect.width()
-        orig_h = self._drag_start_rect.height()
-        new_w = max(abs(proj_x), 4) if handle in self._CHANGES_X else orig_w
-        new_h = max(abs(proj_y), 4) if handle in self._CHANGES_Y else orig_h
-        sx = (proj_x / 2) if handle in self._CHANGES_X else 0
-        sy = (proj_y / 2) if handle in self._CHANGES_Y else 0
+        resize_x, resize_y = self._resize_axes
+        if resize_x:
+            new_w, sx = max(abs(proj_x), 4), proj_x / 2
+        else:
+            new_w, sx = self._drag_start_rect.width(), 0
+        if resize_y:
+            new_h, sy = max(abs(proj_y), 4), proj_y / 2
+        else:
+            new_h, sy = self._drag_start_rect.height(), 0
         cx = anchor.x() + sx * cos_a - sy * sin_a
         cy = anchor.y() + sx * sin_a + sy * cos_a
         self._rect = QRect(int(cx - new_w / 2), int(cy - new_h / 2),
@@ -1198,8 +1711,9 @@ class SelectionTool(BaseTool):
         if self._state == "selecting":
             self._rect = QRect(self._start, event.pos()).normalized()
             if self._rect.width() > 1 and self._rect.height() > 1:
-                self._snippet = self.canvas.pixmap.copy(self._rect)
-                p = QPainter(self.canvas.pixmap)
+                self._snippet = QPixmap.fromImage(
+                    self.canvas.image.copy(self._rect))
+                p = QPainter(self.canvas.image)
                 p.fillRect(self._rect, self.canvas.bg_color)
                 p.end()
                 self._make_snippet_display()
@@ -1237,7 +1751,13 @@ class SelectionTool(BaseTool):
             center = r.center()
             inv_z = 1.0 / self.canvas.zoom if self.canvas.zoom > 0 else 1.0
             # Draw snippet (rotated + scaled) with checkerboard behind transparency
-            display = self._snippet_display if self._snippet_display else self._snippet
+            if self._display_mips:
+                # Draw from the mip level nearest the on-screen size
+                z = self.canvas.zoom
+                display = self._pick_mip(self._display_mips,
+                                         r.width() * z, r.height() * z)
+            else:
+                display = self._snippet_display or self._snippet
             if display and not display.isNull():
                 painter.save()
                 painter.translate(center)
@@ -1320,20 +1840,11 @@ class SelectionTool(BaseTool):
         self._commit()
         self.canvas.save_undo()
         pw, ph = pixmap.width(), pixmap.height()
-        cw, ch = self.canvas.pixmap.width(), self.canvas.pixmap.height()
+        cw, ch = self.canvas.image.width(), self.canvas.image.height()
         if pw > cw or ph > ch:
             # Expand canvas to fit – place image at origin
-            new_pm = QPixmap(max(cw, pw), max(ch, ph))
-            new_pm.fill(self.canvas.bg_color)
-            p = QPainter(new_pm)
-            p.setCompositionMode(QPainter.CompositionMode_Source)
-            p.drawPixmap(0, 0, self.canvas.pixmap)
-            p.end()
-            self.canvas.pixmap = new_pm
+            self.canvas.grow_to(pw, ph)
             self.canvas.update()
-            w = self.canvas.window()
-            if hasattr(w, '_update_size_label'):
-                w._update_size_label()
             # Large paste always starts at origin so nothing is clipped
             x, y = 0, 0
         elif center is not None:
@@ -1341,6 +1852,10 @@ class SelectionTool(BaseTool):
             y = center.y() - ph // 2
         else:
             x, y = 0, 0
+        img = pixmap.toImage()
+        if img.format() != CANVAS_FORMAT:
+            # Keep every snippet premultiplied like the canvas it came from
+            pixmap = QPixmap.fromImage(img.convertToFormat(CANVAS_FORMAT))
         self._snippet = pixmap
         self._make_snippet_display()
         self._rect = QRect(QPoint(x, y), pixmap.size())
@@ -1351,9 +1866,9 @@ class SelectionTool(BaseTool):
     def select_all(self):
         self._commit()
         self.canvas.save_undo()
-        r = self.canvas.pixmap.rect()
-        self._snippet = self.canvas.pixmap.copy(r)
-        p = QPainter(self.canvas.pixmap)
+        r = self.canvas.image.rect()
+        self._snippet = QPixmap.fromImage(self.canvas.image.copy(r))
+        p = QPainter(self.canvas.image)
         p.fillRect(r, self.canvas.bg_color)
         p.end()
         self._make_snippet_display()
@@ -1367,6 +1882,89 @@ class SelectionTool(BaseTool):
                 and self._snippet is not None)
 
 
+# ---------------------------------------------------------------------------
+# Undo history storage
+# ---------------------------------------------------------------------------
+class _PackedImage:
+    """A QImage whose pixels are zlib-compressed on a worker thread.
+
+    Stands in for the QImage of an undo entry.  The source image is kept
+    until compression finishes, so image() never has to wait on the worker;
+    afterwards only the compressed bytes remain.
+    """
+
+    _executor = None
+
+    def __init__(self, img):
+        if _PackedImage._executor is None:
+            _PackedImage._executor = ThreadPoolExecutor(max_workers=1)
+        self._img = img
+        self._size = img.size()
+        self._format = img.format()
+        self._bpl = img.bytesPerLine()
+        self._future = self._executor.submit(self._compress, img)
+
+    @staticmethod
+    def _compress(img):
+        ptr = img.constBits()
+        ptr.setsize(img.sizeInBytes())
+        return zlib.compress(memoryview(ptr), 1)
+
+    def _drop_source(self):
+        if self._img is not None and self._future.done():
+            self._img = None
+
+    def sizeInBytes(self):
+        self._drop_source()
+        if self._img is not None:
+            return self._img.sizeInBytes()
+        return len(self._future.result())
+
+    def image(self):
+        """Return the stored pixels as a QImage."""
+        self._drop_source()
+        if self._img is not None:
+            return self._img
+        data = zlib.decompress(self._future.result())
+        return QImage(data, self._size.width(), self._size.height(),
+                      self._bpl, self._format).copy()
+
+
+def _pack_image(img):
+    """Return *img* as stored on the undo stack: packed if it is large."""
+    if img.sizeInBytes() >= UNDO_COMPRESS_MIN:
+        return _PackedImage(img)
+    return img
+
+
+def _unpack_image(img):
+    return img.image() if isinstance(img, _PackedImage) else img
+
+
+class _CanvasEvent:
+    """Mouse event handed to tools, with pos() in canvas coordinates."""
+
+    __slots__ = ("_pos", "_button", "_buttons", "_modifiers")
+
+    def __init__(self, pos, button, buttons, modifiers):
+        self._pos = pos
+        self._button = button
+        self._buttons = buttons
+        self._modifiers = modifiers
+
+    def pos(self):
+        return self._pos
+
+    def button(self):
+        return self._button
+
+    def buttons(self):
+        return self._buttons
+
+    def modifiers(self):
+        return self._modifiers
+
+
 # ---------------------------------------------------------------------------
 # Canvas widget
 # ---------------------------------------------------------------------------
@@ -1377,29 +1975,39 @@ class Canvas(QWidget):
     cursor_moved = pyqtSignal(int, int)
 
     @property
-    def pixmap(self):
-        return self._pixmap
-
-    @pixmap.setter
-    def pixmap(self, pm):
-        """Ensure the canvas pixmap always has an alpha channel."""
-        if isinstance(pm, QPixmap) and not pm.hasAlphaChannel():
-            alpha_pm = QPixmap(pm.size())
-            alpha_pm.fill(Qt.transparent)
-            p = QPainter(alpha_pm)
-            p.drawPixmap(0, 0, pm)
-            p.end()
-            self._pixmap = alpha_pm
-        else:
-            self._pixmap = pm
+    def image(self):
+        return self._image
+
+    @image.setter
+    def image(self, img):
+        """Keep the canvas image in CANVAS_FORMAT so it always has alpha."""
+        if isinstance(img, QPixmap):
+            img = img.toImage()
+        if img.format() != CANVAS_FORMAT:
+            img = img.convertToFormat(CANVAS_FORMAT)
+        self._image = img
+        self._pixels = None
+        self.mark_changed()
+
+    def pixels(self):
+        """Return a writable (h, w) uint32 NumPy view of the canvas image.
+
+        The view is cached between calls.  QImage detaches its buffer when
+        a shared copy (e.g. an undo snapshot) exists, so the cache is only
+        reused while the image still owns the same buffer.
+        """
+        ptr = self._image.bits()
+        if self._pixels is None or self._pixels_addr != int(ptr):
+            self._pixels = _image_array(self._image)
+            self._pixels_addr = int(ptr)
+        return self._pixels
 
     def __init__(self, width=DEFAULT_WIDTH, height=DEFAULT_HEIGHT, parent=None):
         super().__init__(parent)
-        self._pixmap = QPixmap(width, height)
-        self._pixmap.fill(Qt.transparent)
-        p = QPainter(self._pixmap)
-        p.fillRect(0, 0, width, height, Qt.white)
-        p.end()
+        self._image = QImage(width, height, CANVAS_FORMAT)
+        self._image.fill(Qt.white)
+        self._pixels = None            # cached NumPy view, see pixels()
+        self._pixels_addr = 0
 
         self.fg_color = QColor(Qt.black)
         self.bg_color = QColor(Qt.white)
@@ -1409,13 +2017,14 @@ class Canvas(QWidget):
         self.zoom = 1.0
         self._modified = False
 
-        # Pan offset: where pixmap origin sits in widget coords (before zoom)
+        # Pan offset: where image origin sits in widget coords (before zoom)
         self._pan_offset = QPoint(40, 40)
         self._pending_center = True  # center on first real resize
 
-        # Undo / redo stacks
+        # Undo / redo stacks, see save_undo()
         self._undo_stack = []
         self._redo_stack = []
+        self._undo_before = None
 
         # Tools
         self._tools = {
@@ -1433,19 +2042,38 @@ class Canvas(QWidget):
         }
         self._current_tool_type = ToolType.PENCIL
         self._current_tool = self._tools[ToolType.PENCIL]
+        # Cached ``_current_tool_type in _SIZE_CURSOR_TOOLS``, tested on
+        # every mouse move and repaint
+        self._size_cursor = ToolType.PENCIL in self._SIZE_CURSOR_TOOLS
 
         self._mouse_pos = QPoint(-1, -1)  # widget-space mouse position
-        # Pre-built checker tile for transparency display
+        self._cursor_rect = QRect()       # on-screen area of the cursor
+        self._last_canvas_pos = None      # canvas pixel of the last move
+        # Pre-built checker tile for transparency display: the 2x2 cell
+        # pattern is written as pixels and scaled up without smoothing
         cs = 8
-        self._checker_tile = QPixmap(cs * 2, cs * 2)
-        cp = QPainter(self._checker_tile)
-        cp.fillRect(0, 0, cs, cs, QColor(220, 180, 220))
-        cp.fillRect(cs, 0, cs, cs, QColor(180, 140, 180))
-        cp.fillRect(0, cs, cs, cs, QColor(180, 140, 180))
-        cp.fillRect(cs, cs, cs, cs, QColor(220, 180, 220))
-        cp.end()
+        light = QColor(220, 180, 220).rgb()
+        dark = QColor(180, 140, 180).rgb()
+        cells = QImage(2, 2, QImage.Format_RGB32)
+        cells.setPixel(0, 0, light)
+        cells.setPixel(1, 0, dark)
+        cells.setPixel(0, 1, dark)
+        cells.setPixel(1, 1, light)
+        self._checker_tile = QPixmap.fromImage(cells.scaled(cs * 2, cs * 2))
+        self._checker_brush = QBrush(self._checker_tile)
+        self._checker_cache = (QSize(), None)  # see _checker_pixmap()
+        # Cosmetic pens for the brush outline and the resize preview, built
+        # once rather than on every repaint
+        self._outline_pens = (QPen(QColor(0, 0, 0, 180), 0),
+                              QPen(QColor(255, 255, 255, 180), 0, Qt.DashLine))
+        self._resize_pens = (QPen(QColor(0, 0, 0), 1, Qt.DashLine),
+                             QPen(QColor(255, 255, 255), 1, Qt.DashLine))
+        self._resize_pens[1].setDashOffset(4)
+        for pen in self._outline_pens + self._resize_pens:
+            pen.setCosmetic(True)
 
         self._init_wheel_timer()
+        self._init_update_timer()
 
         self.setMouseTracking(True)
         self.setFocusPolicy(Qt.StrongFocus)
@@ -1460,7 +2088,9 @@ class Canvas(QWidget):
         self._current_tool_type = tool_type
         self._current_tool = self._tools[tool_type]
         self._current_tool.activate()
-        if tool_type in self._SIZE_CURSOR_TOOLS:
+        self._size_cursor = tool_type in self._SIZE_CURSOR_TOOLS
+        self._hover_region = None
+        if self._size_cursor:
             self.setCursor(Qt.BlankCursor)
         else:
             self.setCursor(self._current_tool.get_cursor())
@@ -1472,9 +2102,18 @@ class Canvas(QWidget):
     def current_tool(self):
         return self._current_tool
 
+    def end_stroke(self):
+        """Close the current tool's stroke painter, if one is open.
+
+        Only one QPainter can be active on the image, and a freehand
+        stroke keeps one open for the whole drag, so this runs before
+        anything else writes to or replaces the image.
+        """
+        self._current_tool.end_stroke()
+
     def make_painter(self):
-        """Create a QPainter on the pixmap with current AA setting."""
-        p = QPainter(self.pixmap)
+        """Create a QPainter on the canvas image with current AA setting."""
+        p = QPainter(self.image)
         if self.antialiasing:
             p.setRenderHint(QPainter.Antialiasing)
         return p
@@ -1485,22 +2124,99 @@ class Canvas(QWidget):
         return self._modified
 
     def set_modified(self, val=True):
+        if val:
+            self.mark_changed()
         if self._modified != val:
             self._modified = val
             self.modified_changed.emit()
 
+    # --- Image revision ---
+    _revision = 0
+
+    def mark_changed(self):
+        """Record that the image pixels were written.
+
+        Drawing through a QPainter that is already open, as a freehand
+        stroke does, leaves image.cacheKey() unchanged, so anything cached
+        from the pixels is keyed on image_key() instead.  Called from the
+        image setter, update_canvas_rect(), set_modified() and undo/redo.
+        """
+        self._revision += 1
+
+    def image_key(self):
+        """Return a value that changes whenever the image is replaced or
+        its pixels are written."""
+        return (self._image.cacheKey(), self._revision)
+
     # --- Undo / Redo ---
+    # History entries are (rect, image) pairs holding only the pixels inside
+    # *rect* as they were before (undo) or after (redo) a change.  rect is
+    # None when the whole image was replaced, e.g. by a resize or rotation.
     def save_undo(self):
-        self._undo_stack.append(self.pixmap.copy())
-        if len(self._undo_stack) > MAX_UNDO:
-            self._undo_stack.pop(0)
+        """Mark the start of an undoable change.
+
+        Only a shallow copy of the image is kept here; it detaches once
+        something paints on the canvas.  The changed region is cut out of it
+        when the next change starts or when undo is requested.
+        """
+        self.end_stroke()
+        self._push_pending_undo()
+        self._undo_before = QImage(self.image)
+        self._redo_stack.clear()
+
+    def _push_pending_undo(self):
+        before, self._undo_before = self._undo_before, None
+        if before is None:
+            return
+        if before.size() != self.image.size():
+            entry = (None, _pack_image(before))
+        else:
+            rect = _changed_rect(before, self.image)
+            if rect is None:
+                return
+            entry = (rect, _pack_image(before.copy(rect)))
+        self._undo_stack.append(entry)
+        self._trim_undo()
+
+    def _trim_undo(self):
+        """Drop the oldest undo entries beyond MAX_UNDO or the memory budget.
+
+        Sizes are summed afresh each time because packed entries shrink
+        once their background compression finishes.
+        """
+        del self._undo_stack[:-MAX_UNDO]
+        total = sum(img.sizeInBytes() for _, img in self._undo_stack)
+        while len(self._undo_stack) > 1 and total > UNDO_MEMORY_BUDGET:
+            total -= self._undo_stack.pop(0)[1].sizeInBytes()
+
+    def _apply_history(self, entry):
+        """Restore a history entry and return the entry that reverses it."""
+        rect, img = entry
+        img = _unpack_image(img)
+        if rect is None:
+            inverse = (None, self.image)
+            self.image = img
+        else:
+            inverse = (rect, self.image.copy(rect))
+            p = QPainter(self.image)
+            p.setCompositionMode(QPainter.CompositionMode_Source)
+            p.drawImage(rect.topLeft(), img)
+            p.end()
+            self.mark_changed()
+        return inverse
+
+    def _clear_history(self):
+        self._undo_stack.clear()
         self._redo_stack.clear()
+        self._undo_before = None
 
     def undo(self):
+        self.end_stroke()
+        self._push_pending_undo()
         if not self._undo_stack:
             return
-        self._redo_stack.append(self.pixmap.copy())
-        self.pixmap = self._undo_stack.pop()
+        entry = self._undo_stack.pop()
+        self._redo_stack.append(self._apply_history(entry))
         self.update()
         self.set_modified()
         w = self.window()
@@ -1508,10 +2224,12 @@ class Canvas(QWidget):
             w._update_size_label()
 
     def redo(self):
+        self.end_stroke()
         if not self._redo_stack:
             return
-        self._undo_stack.append(self.pixmap.copy())
-        self.pixmap = self._redo_stack.pop()
+        rect, img = self._apply_history(self._redo_stack.pop())
+        self._undo_stack.append((rect, _pack_image(img)))
+        self._trim_undo()
         self.update()
         self.set_modified()
         w = self.window()
@@ -1546,9 +2264,9 @@ class Canvas(QWidget):
         self.set_zoom(1.0)
 
     def center_canvas(self):
-        """Center the pixmap in the widget."""
-        pw = int(self.pixmap.width() * self.zoom)
-        ph = int(self.pixmap.height() * self.zoom)
+        """Center the image in the widget."""
+        pw = int(self.image.width() * self.zoom)
+        ph = int(self.image.height() * self.zoom)
         self._pan_offset = QPoint((self.width() - pw) // 2,
                                   (self.height() - ph) // 2)
         self.update()
@@ -1565,6 +2283,7 @@ class Canvas(QWidget):
     brush_size_changed = pyqtSignal(int)
 
     _ZOOM_NOTCH_FACTOR = 1.15
+    _UPDATE_INTERVAL_MS = 8  # mouse-move repaints are coalesced to this
 
     def _init_wheel_timer(self):
         """Set up a single-shot 0ms timer that fires once the event queue is
@@ -1602,25 +2321,71 @@ class Canvas(QWidget):
                 self._brush_wheel_accum += 120
                 self.brush_size = max(1, self.brush_size - 1)
             self.brush_size_changed.emit(self.brush_size)
-            self.update()
+            self.update_cursor()
 
     # --- Coordinate helpers ---
     def _canvas_pos(self, event):
-        """Map widget position to pixmap coordinates."""
+        """Map widget position to image coordinates."""
         wp = event.pos()
         return QPoint(int((wp.x() - self._pan_offset.x()) / self.zoom),
                       int((wp.y() - self._pan_offset.y()) / self.zoom))
 
+    def canvas_to_widget_rect(self, rect):
+        """Map a canvas-space QRect to the widget-space QRect covering it."""
+        z = self.zoom
+        r = QRectF(self._pan_offset.x() + rect.x() * z,
+                   self._pan_offset.y() + rect.y() * z,
+                   rect.width() * z, rect.height() * z)
+        return r.toAlignedRect().adjusted(-1, -1, 1, 1)
+
+    def update_canvas_rect(self, rect):
+        """Schedule a repaint of the canvas-space *rect* only.
+
+        Callers use this after drawing into *rect*, so it also marks the
+        image as changed.
+        """
+        self.mark_changed()
+        self.request_update(self.canvas_to_widget_rect(rect))
+
+    def _init_update_timer(self):
+        """Set up a single-shot timer that coalesces the repaint requests
+        made within ``_UPDATE_INTERVAL_MS`` into one ``update()`` call, so
+        a high-rate mouse repaints at most about once per display frame."""
+        self._update_timer = QTimer(self)
+        self._update_timer.setSingleShot(True)
+        self._update_timer.setInterval(self._UPDATE_INTERVAL_MS)
+        self._update_timer.timeout.connect(self._flush_update)
+        self._pending_update = QRect()   # widget-space union of requests
+        self._pending_full_update = False
+
+    def request_update(self, rect=None):
+        """Schedule a repaint of widget-space *rect*, or the whole widget."""
+        if rect is None:
+            self._pending_full_update = True
+        else:
+            self._pending_update |= rect
+        if not self._update_timer.isActive():
+            self._update_timer.start()
+
+    def _flush_update(self):
+        self._update_timer.stop()
+        if self._pending_full_update:
+            self.update()
+        elif not self._pending_update.isEmpty():
+            self.update(self._pending_update)
+        self._pending_update = QRect()
+        self._pending_full_update = False
+
     def _is_over_canvas(self, widget_pos):
-        """Check if a widget-space position is over the pixmap area."""
+        """Check if a widget-space position is over the image area."""
         cx = (widget_pos.x() - self._pan_offset.x()) / self.zoom
         cy = (widget_pos.y() - self._pan_offset.y()) / self.zoom
-        return 0 <= cx < self.pixmap.width() and 0 <= cy < self.pixmap.height()
+        return 0 <= cx < self.image.width() and 0 <= cy < self.image.height()
 
     def _near_canvas_corner(self, widget_pos, margin=8):
         """Check if widget_pos is near the bottom-right corner of the canvas."""
-        br_x = self._pan_offset.x() + self.pixmap.width() * self.zoom
-        br_y = self._pan_offset.y() + self.pixmap.height() * self.zoom
+        br_x = self._pan_offset.x() + self.image.width() * self.zoom
+        br_y = self._pan_offset.y() + self.image.height() * self.zoom
         dx = abs(widget_pos.x() - br_x)
         dy = abs(widget_pos.y() - br_y)
         return dx < margin and dy < margin
@@ -1633,6 +2398,12 @@ class Canvas(QWidget):
     _resize_active = False
     _resize_preview_size = None  # QSize during drag
 
+    # --- Hover cursor state ---
+    # Where the pointer was on the last move, so the cursor is only set
+    # when it crosses between regions; None after anything else set it
+    _HOVER_CORNER, _HOVER_IMAGE, _HOVER_OUTSIDE = range(3)
+    _hover_region = None
+
     # --- Mouse events ---
     def mousePressEvent(self, event):
         self._pending_center = False
@@ -1640,12 +2411,13 @@ class Canvas(QWidget):
         if event.button() == Qt.MiddleButton:
             self._pan_active = True
             self._pan_start = event.globalPos()
+            self._hover_region = None
             self.setCursor(Qt.ClosedHandCursor)
             event.accept()
             return
         if event.button() == Qt.LeftButton and self._near_canvas_corner(event.pos()):
             self._resize_active = True
-            self._resize_preview_size = self.pixmap.size()
+            self._resize_preview_size = self.image.size()
             self.setCursor(Qt.SizeFDiagCursor)
             event.accept()
             return
@@ -1660,7 +2432,7 @@ class Canvas(QWidget):
             self._pan_offset += delta
             if hasattr(self._current_tool, 'on_zoom_changed'):
                 self._current_tool.on_zoom_changed()
-            self.update()
+            self.request_update()
             event.accept()
             return
         if self._resize_active:
@@ -1670,36 +2442,56 @@ class Canvas(QWidget):
             w = self.window()
             if hasattr(w, '_size_label'):
                 w._size_label.setText(f"{new_w} x {new_h} px")
-            self.update()
+            self.request_update()
             event.accept()
             return
-        # Show resize cursor when near corner (before tool cursor logic)
+        cp = self._canvas_pos(event)
         if self._near_canvas_corner(event.pos()):
-            if self.cursor().shape() != Qt.SizeFDiagCursor:
-                self.setCursor(Qt.SizeFDiagCursor)
-        # Toggle cursor: blank over canvas for size-cursor tools, normal otherwise
-        elif self._current_tool_type in self._SIZE_CURSOR_TOOLS:
-            if self._is_over_canvas(event.pos()):
-                if self.cursor().shape() != Qt.BlankCursor:
-                    self.setCursor(Qt.BlankCursor)
-            else:
-                if self.cursor().shape() == Qt.BlankCursor:
-                    self.setCursor(Qt.ArrowCursor)
-        elif self._current_tool_type == ToolType.SELECTION:
-            cp = self._canvas_pos(event)
+            region = self._HOVER_CORNER
+        elif self._is_over_canvas(event.pos()):
+            region = self._HOVER_IMAGE
+        else:
+            region = self._HOVER_OUTSIDE
+        if (self._current_tool_type == ToolType.SELECTION
+                and region != self._HOVER_CORNER):
+            # Handles and the move area need a per-position cursor
+            self._hover_region = region
             cur = self._current_tool.cursor_at(cp)
             if self.cursor().shape() != cur:
                 self.setCursor(cur)
-        elif self.cursor().shape() == Qt.SizeFDiagCursor:
-            self.setCursor(self._current_tool.get_cursor())
-        cp = self._canvas_pos(event)
-        self.cursor_moved.emit(cp.x(), cp.y())
-        e = self._make_canvas_event(event)
-        self._current_tool.mouse_move(e)
-        self.update()  # repaint for cursor circle
+        elif region != self._hover_region:
+            # Resize cursor near the corner; blank over the image for
+            # size-cursor tools; the tool's own cursor otherwise
+            self._hover_region = region
+            if region == self._HOVER_CORNER:
+                self.setCursor(Qt.SizeFDiagCursor)
+            elif not self._size_cursor:
+                self.setCursor(self._current_tool.get_cursor())
+            elif region == self._HOVER_IMAGE:
+                self.setCursor(Qt.BlankCursor)
+            else:
+                self.setCursor(Qt.ArrowCursor)
+        # Tools only see whole canvas pixels, so moves within the same
+        # pixel (common when zoomed in) have nothing new to tell them
+        if cp != self._last_canvas_pos:
+            self._last_canvas_pos = cp
+            self.cursor_moved.emit(cp.x(), cp.y())
+            self._current_tool.mouse_move(self._make_canvas_event(event))
+        # Tools schedule their own repaints; only the brush outline and
+        # crosshair need redrawing here
+        self.update_cursor()
+
+    def update_cursor(self):
+        """Schedule a repaint of the brush outline and crosshair: where they
+        are now on screen and where they will be drawn next, unless that is
+        the same place."""
+        cursor = self._cursor_area()
+        if cursor != self._cursor_rect:
+            self.request_update(self._cursor_rect | cursor)
 
     def leaveEvent(self, event):
         self._mouse_pos = QPoint(-1, -1)
+        self._hover_region = None
         if self.cursor().shape() == Qt.BlankCursor:
             self.setCursor(Qt.ArrowCursor)
         self.update()
@@ -1707,7 +2499,8 @@ class Canvas(QWidget):
     def mouseReleaseEvent(self, event):
         if event.button() == Qt.MiddleButton and self._pan_active:
             self._pan_active = False
-            if self._current_tool_type in self._SIZE_CURSOR_TOOLS:
+            self._hover_region = None
+            if self._size_cursor:
                 self.setCursor(Qt.BlankCursor)
             else:
                 self.setCursor(self._current_tool.get_cursor())
@@ -1715,10 +2508,11 @@ class Canvas(QWidget):
             return
         if event.button() == Qt.LeftButton and self._resize_active:
             self._resize_active = False
+            self._hover_region = None
             sz = self._resize_preview_size
             self._resize_preview_size = None
-            if sz and (sz.width() != self.pixmap.width()
-                       or sz.height() != self.pixmap.height()):
+            if sz and (sz.width() != self.image.width()
+                       or sz.height() != self.image.height()):
                 self.resize_canvas(sz.width(), sz.height())
             w = self.window()
             if hasattr(w, '_update_size_label'):
@@ -1728,17 +2522,13 @@ class Canvas(QWidget):
             return
         e = self._make_canvas_event(event)
         self._current_tool.mouse_release(e)
+        # Show the end of a drag right away rather than on the next tick
+        self._flush_update()
 
     def _make_canvas_event(self, event):
         """Create a lightweight wrapper with canvas-space pos()."""
-        class _E:
-            pass
-        e = _E()
-        e.pos = lambda: self._canvas_pos(event)
-        e.button = event.button
-        e.buttons = event.buttons
-        e.modifiers = event.modifiers
-        return e
+        return _CanvasEvent(self._canvas_pos(event), event.button(),
+                            event.buttons(), event.modifiers())
 
     # --- Drag and drop ---
     def dragEnterEvent(self, event):
@@ -1756,9 +2546,9 @@ class Canvas(QWidget):
         if mime.hasImage():
             img = mime.imageData()
             if isinstance(img, QImage) and not img.isNull():
-                self.pixmap = QPixmap.fromImage(img)
+                self.image = img
             elif isinstance(img, QPixmap) and not img.isNull():
-                self.pixmap = img
+                self.image = img.toImage()
             self.center_canvas()
             w = self.window()
             if hasattr(w, '_update_size_label'):
@@ -1766,38 +2556,34 @@ class Canvas(QWidget):
             self.set_modified()
 
     # --- Keyboard fallback (in case QAction shortcuts don't fire) ---
+    # Ctrl shortcuts, which also fire with Shift held; Ctrl+Shift+S is the
+    # one exception and is checked first
+    _CTRL_SHORTCUTS = {
+        Qt.Key_V: lambda canvas: canvas.window()._edit_paste(),
+        Qt.Key_C: lambda canvas: canvas.window()._edit_copy(),
+        Qt.Key_X: lambda canvas: canvas.window()._edit_cut(),
+        Qt.Key_A: lambda canvas: canvas.window()._edit_select_all(),
+        Qt.Key_Z: lambda canvas: canvas.undo(),
+        Qt.Key_Y: lambda canvas: canvas.redo(),
+        Qt.Key_N: lambda canvas: canvas.window()._file_new(),
+        Qt.Key_O: lambda canvas: canvas.window()._file_open(),
+        Qt.Key_S: lambda canvas: canvas.window()._file_save(),
+        Qt.Key_Equal: lambda canvas: canvas.zoom_in(),
+        Qt.Key_Minus: lambda canvas: canvas.zoom_out(),
+        Qt.Key_0: lambda canvas: canvas.zoom_reset(),
+    }
+
     def keyPressEvent(self, event):
         log.info(f"[key] {event.key()} mods={int(event.modifiers())}")
         mods = event.modifiers()
         key = event.key()
         ctrl = mods & Qt.ControlModifier
         shift = mods & Qt.ShiftModifier
-        if ctrl and key == Qt.Key_V:
-            self.window()._edit_paste()
-        elif ctrl and key == Qt.Key_C:
-            self.window()._edit_copy()
-        elif ctrl and key == Qt.Key_X:
-            self.window()._edit_cut()
-        elif ctrl and key == Qt.Key_A:
-            self.window()._edit_select_all()
-        elif ctrl and key == Qt.Key_Z:
-            self.undo()
-        elif ctrl and key == Qt.Key_Y:
-            self.redo()
-        elif ctrl and key == Qt.Key_N:
-            self.window()._file_new()
-        elif ctrl and key == Qt.Key_O:
-            self.window()._file_open()
-        elif ctrl and shift and key == Qt.Key_S:
+        action = self._CTRL_SHORTCUTS.get(key) if ctrl else None
+        if ctrl and shift and key == Qt.Key_S:
             self.window()._file_save_as()
-        elif ctrl and key == Qt.Key_S:
-            self.window()._file_save()
-        elif ctrl and key == Qt.Key_Equal:
-            self.zoom_in()
-        elif ctrl and key == Qt.Key_Minus:
-            self.zoom_out()
-        elif ctrl and key == Qt.Key_0:
-            self.zoom_reset()
+        elif action is not None:
+            action(self)
         elif key == Qt.Key_Delete:
             self.window()._edit_delete()
         elif not ctrl and not shift and key in TOOL_SHORTCUTS:
@@ -1808,127 +2594,174 @@ class Canvas(QWidget):
     _SIZE_CURSOR_TOOLS = {ToolType.BRUSH, ToolType.ERASER, ToolType.ALPHA_BRUSH,
                           ToolType.LINE, ToolType.RECTANGLE, ToolType.ELLIPSE}
 
-    # --- Pixel-snapped brush outline cache ---
-    _brush_outline_cache = (-1, None)  # (brush_size, QPainterPath)
-
+    def _cursor_visible(self):
+        """True if the brush outline and crosshair are drawn at the mouse."""
+        return (self._mouse_pos.x() >= 0
+                and self._size_cursor
+                and self._is_over_canvas(self._mouse_pos))
+
+    def _cursor_area(self):
+        """Return the widget-space QRect that paintEvent's brush outline and
+        crosshair cover at the current mouse position (empty if hidden)."""
+        if not self._cursor_visible():
+            return QRect()
+        mx, my = self._mouse_pos.x(), self._mouse_pos.y()
+        cx = int((mx - self._pan_offset.x()) / self.zoom)
+        cy = int((my - self._pan_offset.y()) / self.zoom)
+        outline = self._get_brush_outline(self.brush_size).boundingRect()
+        area = self.canvas_to_widget_rect(
+            outline.toAlignedRect().translated(cx, cy))
+        c = 4
+        return (area | QRect(mx - c, my - c, 2 * c + 1, 2 * c + 1)).adjusted(
+            -1, -1, 1, 1)
+
+    def _crosshair_pen(self, cx, cy):
+        """Return a black or white pen contrasting with canvas pixel
+        (*cx*, *cy*) as shown on screen, i.e. composited over the checker.
+
+        Drawing with a plain pen keeps the painter on its normal blending
+        path instead of switching to the much slower XOR raster op.
+        """
+        cx = min(max(cx, 0), self.image.width() - 1)
+        cy = min(max(cy, 0), self.image.height() - 1)
+        rgba = self.image.pixel(cx, cy)
+        a = rgba >> 24
+        luma = (299 * ((rgba >> 16) & 0xFF) + 587 * ((rgba >> 8) & 0xFF)
+                + 114 * (rgba & 0xFF)) // 1000
+        # Transparent pixels show the (light) checkerboard
+        luma = (luma * a + 200 * (255 - a)) // 255
+        return _pen(0xFF000000 if luma >= 128 else 0xFFFFFFFF, 1)
+
+    # --- Pixel-snapped brush outline ---
     def _get_brush_outline(self, brush_size):
         """Return a QPainterPath tracing the pixel outline of a round brush,
-        centered at origin in canvas pixel coordinates.  Cached per size."""
-        if self._brush_outline_cache[0] == brush_size:
-            return self._brush_outline_cache[1]
-
-        # Rasterize one dot at canvas resolution (no AA, matches brush drawing)
-        pad = 2
-        s = brush_size + pad * 2
-        center = s // 2
-        img = QImage(s, s, QImage.Format_ARGB32_Premultiplied)
-        img.fill(Qt.transparent)
-        p = QPainter(img)
-        p.setRenderHint(QPainter.Antialiasing, False)
-        p.setPen(QPen(Qt.white, brush_size, Qt.SolidLine, Qt.RoundCap))
-        p.drawPoint(center, center)
-        p.end()
-
-        # Fast alpha access via raw bytes
-        stride = img.bytesPerLine()
-        ptr = img.constBits()
-        ptr.setsize(s * stride)
-        buf = bytes(ptr)
-
-        def alpha(x, y):
-            if 0 <= x < s and 0 <= y < s:
-                return buf[y * stride + x * 4 + 3]
-            return 0
-
-        ox, oy = center, center
-        path = QPainterPath()
-
-        # Horizontal edges (top / bottom), merged per row
-        for y in range(s):
-            x = 0
-            while x < s:
-                if alpha(x, y) and not alpha(x, y - 1):
-                    xs = x
-                    while x < s and alpha(x, y) and not alpha(x, y - 1):
-                        x += 1
-                    path.moveTo(xs - ox, y - oy)
-                    path.lineTo(x - ox, y - oy)
-                else:
-                    x += 1
-            x = 0
-            while x < s:
-                if alpha(x, y) and not alpha(x, y + 1):
-                    xs = x
-                    while x < s and alpha(x, y) and not alpha(x, y + 1):
-                        x += 1
-                    path.moveTo(xs - ox, (y + 1) - oy)
-                    path.lineTo(x - ox, (y + 1) - oy)
-                else:
-                    x += 1
-
-        # Vertical edges (left / right), merged per column
-        for x in range(s):
-            y = 0
-            while y < s:
-                if alpha(x, y) and not alpha(x - 1, y):
-                    ys = y
-                    while y < s and alpha(x, y) and not alpha(x - 1, y):
-                        y += 1
-                    path.moveTo(x - ox, ys - oy)
-                    path.lineTo(x - ox, y - oy)
-                else:
-                    y += 1
-            y = 0
-            while y < s:
-                if alpha(x, y) and not alpha(x + 1, y):
-                    ys = y
-                    while y < s and alpha(x, y) and not alpha(x + 1, y):
-                        y += 1
-                    path.moveTo((x + 1) - ox, ys - oy)
-                    path.lineTo((x + 1) - ox, y - oy)
-                else:
-                    y += 1
-
-        self._brush_outline_cache = (brush_size, path)
-        return path
+        centered at origin in canvas pixel coordinates."""
+        return _brush_outline(brush_size)
 
     # --- Paint ---
     _paint_count = 0
     _last_paint_time = 0.0
+    # Workspace + checkerboard + image, composed at widget size.  It is
+    # keyed on image_key(), which changes whenever the pixels are written,
+    # together with the view transform and widget size.
+    _background_cache = (None, None)  # (key, QPixmap)
+    _background_seen = None           # key of the last uncached frame
+    _opaque_cache = (None, False)     # (image_key(), no alpha < 255)
+
+    def _background_key(self):
+        return (self.image_key(), self._pan_offset.x(),
+                self._pan_offset.y(), self.zoom, self.width(), self.height())
+
+    def _image_opaque(self, area):
+        """Return True if the canvas image is known to be fully opaque.
+
+        The scan is cached per image_key().  It is only run for repaints
+        of at least a quarter of the widget (*area*): on smaller ones, such
+        as stroke segments, the clipped checkerboard is cheaper than
+        scanning the whole image.
+        """
+        key = self.image_key()
+        if self._opaque_cache[0] != key:
+            if area.width() * area.height() * 4 < self.width() * self.height():
+                return False
+            self._opaque_cache = (key, _is_opaque(self.image))
+        return self._opaque_cache[1]
+
+    def _checker_pixmap(self):
+        """Return the checkerboard pre-tiled to the image size plus one
+        tile, so that it covers the image at any parallax offset.
+
+        One scaled blit of this is two to three times faster than filling
+        with the small tile brush when zoomed; it is rebuilt only when the
+        image size changes.
+        """
+        size = self.image.size()
+        if self._checker_cache[0] != size:
+            pm = QPixmap(size.width() + self._checker_tile.width(),
+                         size.height() + self._checker_tile.height())
+            p = QPainter(pm)
+            p.fillRect(pm.rect(), self._checker_brush)
+            p.end()
+            self._checker_cache = (size, pm)
+        return self._checker_cache[1]
+
+    def _paint_background(self, painter, area):
+        """Paint the workspace, checkerboard and canvas image in widget
+        coordinates for the widget-space rect *area*.  The painter's state
+        is restored afterwards."""
+        painter.save()
+        # Gray workspace background
+        painter.fillRect(self.rect(), QColor(128, 128, 128))
+        painter.translate(self._pan_offset)
+        painter.scale(self.zoom, self.zoom)
+        # Checkerboard behind canvas to show transparency (with parallax).
+        # An opaque image covers it completely, so it is skipped then.
+        if not self._image_opaque(area):
+            # Offset the tiling origin so the checkerboard scrolls at half
+            # the canvas rate, creating a subtle depth/parallax effect.
+            tile_w = self._checker_tile.width()
+            tile_h = self._checker_tile.height()
+            parallax = 0.5  # 0 = locked to canvas, 1 = locked to screen
+            px_off = int(self._pan_offset.x() * parallax / self.zoom) % tile_w
+            py_off = int(self._pan_offset.y() * parallax / self.zoom) % tile_h
+            painter.setClipRect(self.image.rect())
+            painter.drawPixmap(-px_off, -py_off, self._checker_pixmap())
+            painter.setClipping(False)
+        painter.drawImage(0, 0, self.image)
+        painter.restore()
+
+    def _draw_background(self, painter, area):
+        """Draw the background over widget-space *area*, reusing the composed pixmap when nothing
+        under the overlays changed since the last frame.
+
+        The pixmap is only composed once the same key is seen twice in a
+        row (e.g. hover repaints), so frames during a stroke, where the
+        image changes every time, cost no extra blit.
+        """
+        key = self._background_key()
+        cached_key, pm = self._background_cache
+        if cached_key == key:
+            painter.drawPixmap(0, 0, pm)
+            return
+        if self._background_seen != key:
+            self._background_seen = key
+            self._background_cache = (None, None)
+            self._paint_background(painter, area)
+            return
+        dpr = self.devicePixelRatioF()
+        pm = QPixmap(self.size() * dpr)
+        pm.setDevicePixelRatio(dpr)
+        bp = QPainter(pm)
+        self._paint_background(bp, self.rect())
+        bp.end()
+        self._background_cache = (key, pm)
+        painter.drawPixmap(0, 0, pm)
 
     def paintEvent(self, event):
-        import time
-        t0 = time.perf_counter()
-        self._paint_count += 1
-        dt = (t0 - self._last_paint_time) * 1000
-        self._last_paint_time = t0
+        profile = log.isEnabledFor(logging.DEBUG)
+        if profile:
+            t0 = time.perf_counter()
+            self._paint_count += 1
+            dt = (t0 - self._last_paint_time) * 1000
+            self._last_paint_time = t0
 
         painter = QPainter(self)
-        # Gray workspace background
-        painter.fillRect(self.rect(), QColor(128, 128, 128))
-        # Draw pixmap and tool overlay in canvas coordinate space
+        self._draw_background(painter, event.rect())
+        # Draw tool overlay in canvas coordinate space
         painter.translate(self._pan_offset)
         painter.scale(self.zoom, self.zoom)
-        # Checkerboard behind canvas to show transparency (with parallax)
-        # Offset the tiling origin so the checkerboard scrolls at half the
-        # canvas rate, creating a subtle depth/parallax effect.
-        tile_w = self._checker_tile.width()
-        tile_h = self._checker_tile.height()
-        parallax = 0.5  # 0 = locked to canvas, 1 = locked to screen
-        px_off = int(self._pan_offset.x() * parallax / self.zoom) % tile_w
-        py_off = int(self._pan_offset.y() * parallax / self.zoom) % tile_h
-        painter.drawTiledPixmap(0, 0, self.pixmap.width(), self.pixmap.height(),
-                                self._checker_tile,
-                                px_off, py_off)
-        painter.drawPixmap(0, 0, self.pixmap)
         if self.antialiasing:
             painter.setRenderHint(QPainter.Antialiasing)
         self._current_tool.paint_overlay(painter)
         # Pixel-snapped brush outline (drawn in canvas coords so it aligns
         # with the pixel grid when zoomed in)
-        _draw_cursor = (self._mouse_pos.x() >= 0
-                        and self._current_tool_type in self._SIZE_CURSOR_TOOLS
-                        and self._is_over_canvas(self._mouse_pos))
+        _draw_cursor = self._cursor_visible()
+        drawn = self._cursor_area() if _draw_cursor else QRect()
+        if (QRegion(self._cursor_rect) - event.region()).isEmpty():
+            self._cursor_rect = drawn
+        else:
+            # Part of the old cursor lies outside this repaint and stays
+            self._cursor_rect |= drawn
         if _draw_cursor:
             mx, my = self._mouse_pos.x(), self._mouse_pos.y()
             cx = int((mx - self._pan_offset.x()) / self.zoom)
@@ -1937,15 +2770,10 @@ class Canvas(QWidget):
             painter.save()
             painter.translate(cx, cy)
             painter.setRenderHint(QPainter.Antialiasing, False)
-            pen_b = QPen(QColor(0, 0, 0, 180), 0)
-            pen_b.setCosmetic(True)
-            painter.setPen(pen_b)
             painter.setBrush(Qt.NoBrush)
-            painter.drawPath(outline)
-            pen_w = QPen(QColor(255, 255, 255, 180), 0, Qt.DashLine)
-            pen_w.setCosmetic(True)
-            painter.setPen(pen_w)
-            painter.drawPath(outline)
+            for pen in self._outline_pens:
+                painter.setPen(pen)
+                painter.drawPath(outline)
             painter.restore()
         painter.resetTransform()
         # Resize drag preview (dashed outline in widget coords)
@@ -1955,51 +2783,44 @@ class Canvas(QWidget):
             ry = self._pan_offset.y()
             rw = sz.width() * self.zoom
             rh = sz.height() * self.zoom
-            pen_k = QPen(QColor(0, 0, 0), 1, Qt.DashLine)
-            pen_k.setCosmetic(True)
-            painter.setPen(pen_k)
             painter.setBrush(Qt.NoBrush)
-            painter.drawRect(QRectF(rx, ry, rw, rh))
-            pen_wh = QPen(QColor(255, 255, 255), 1, Qt.DashLine)
-            pen_wh.setCosmetic(True)
-            pen_wh.setDashOffset(4)
-            painter.setPen(pen_wh)
-            painter.drawRect(QRectF(rx, ry, rw, rh))
+            for pen in self._resize_pens:
+                painter.setPen(pen)
+                painter.drawRect(QRectF(rx, ry, rw, rh))
             # Dimensions label near corner
-            painter.setPen(QPen(QColor(0, 0, 0)))
+            painter.setPen(_pen(0xFF000000, 1))
             painter.drawText(int(rx + rw + 4), int(ry + rh + 14),
                              f"{sz.width()} x {sz.height()}")
         # Grip square at bottom-right corner (visual affordance)
         if not self._resize_active:
-            br_x = self._pan_offset.x() + self.pixmap.width() * self.zoom
-            br_y = self._pan_offset.y() + self.pixmap.height() * self.zoom
+            br_x = self._pan_offset.x() + self.image.width() * self.zoom
+            br_y = self._pan_offset.y() + self.image.height() * self.zoom
             s = 6
             painter.setRenderHint(QPainter.Antialiasing, False)
-            painter.setPen(QPen(QColor(0, 0, 0), 1))
-            painter.setBrush(QColor(255, 255, 255))
+            painter.setPen(_pen(0xFF000000, 1))
+            painter.setBrush(_brush(0xFFFFFFFF))
             painter.drawRect(QRectF(br_x - s / 2, br_y - s / 2, s, s))
-        # Crosshair at exact mouse position (widget coords, XOR for visibility)
+        # Crosshair at exact mouse position (widget coords), in black or
+        # white depending on the pixel under the mouse
         if _draw_cursor:
             painter.setRenderHint(QPainter.Antialiasing, False)
-            painter.setCompositionMode(QPainter.RasterOp_SourceXorDestination)
-            painter.setPen(QPen(QColor(255, 255, 255), 1))
+            painter.setPen(self._crosshair_pen(cx, cy))
             c = 4
             painter.drawLine(mx - c, my, mx + c, my)
             painter.drawLine(mx, my - c, mx, my + c)
-            painter.setCompositionMode(QPainter.CompositionMode_SourceOver)
         painter.end()
-        import time
-        elapsed = (time.perf_counter() - t0) * 1000
-        if elapsed > 5 or self._paint_count % 50 == 0:
-            log.debug(
-                f"[paint #{self._paint_count}] dt_since_last={dt:.1f}ms "
-                f"paint_ms={elapsed:.1f} zoom={self.zoom:.4f} "
-                f"canvas={self.pixmap.width()}x{self.pixmap.height()}"
-            )
+        if profile:
+            elapsed = (time.perf_counter() - t0) * 1000
+            if elapsed > 5 or self._paint_count % 50 == 0:
+                log.debug(
+                    f"[paint #{self._paint_count}] dt_since_last={dt:.1f}ms "
+                    f"paint_ms={elapsed:.1f} zoom={self.zoom:.4f} "
+                    f"canvas={self.image.width()}x{self.image.height()}"
+                )
 
     # --- Canvas operations ---
     def commit_selection(self):
-        """Commit any floating selection back to the pixmap."""
+        """Commit any floating selection back to the canvas image."""
         tool = self._tools.get(ToolType.SELECTION)
         if tool and tool.has_selection():
             tool._commit()
@@ -2009,31 +2830,53 @@ class Canvas(QWidget):
         log.info("[clear_canvas] called")
         self.commit_selection()
         self.save_undo()
-        self.pixmap.fill(self.bg_color)
+        self.image.fill(self.bg_color)
         self.update()
         self.set_modified()
 
     def resize_canvas(self, new_w, new_h):
         self.commit_selection()
         self.save_undo()
-        new_pm = QPixmap(new_w, new_h)
-        new_pm.fill(self.bg_color)
-        p = QPainter(new_pm)
-        p.setCompositionMode(QPainter.CompositionMode_Source)
-        p.drawPixmap(0, 0, self.pixmap)
-        p.end()
-        self.pixmap = new_pm
+        self.image = self._resized_image(new_w, new_h)
         self.update()
         self.set_modified()
 
+    def _resized_image(self, new_w, new_h):
+        """Return the image cropped or extended to new_w x new_h.
+
+        The kept part is one row-wise copy (QImage.copy), and only the newly
+        exposed strips are painted with the background colour, instead of
+        filling the whole new image and compositing the old one over it.
+        """
+        cur_w, cur_h = self.image.width(), self.image.height()
+        img = self.image.copy(0, 0, new_w, new_h)
+        if new_w > cur_w or new_h > cur_h:
+            p = QPainter(img)
+            p.setCompositionMode(QPainter.CompositionMode_Source)
+            if new_w > cur_w:
+                p.fillRect(cur_w, 0, new_w - cur_w, new_h, self.bg_color)
+            if new_h > cur_h:
+                p.fillRect(0, cur_h, min(cur_w, new_w), new_h - cur_h,
+                           self.bg_color)
+            p.end()
+        return img
+
+    def grow_to(self, min_w, min_h):
+        """Enlarge the canvas, if needed, to at least min_w x min_h."""
+        cur_w, cur_h = self.image.width(), self.image.height()
+        if min_w <= cur_w and min_h <= cur_h:
+            return
+        self.image = self._resized_image(max(cur_w, min_w), max(cur_h, min_h))
+        w = self.window()
+        if hasattr(w, '_update_size_label'):
+            w._update_size_label()
+
     def rotate(self, degrees):
         log.info(f"[rotate] {degrees}")
         self.commit_selection()
         self.save_undo()
         transform = QTransform().rotate(degrees)
-        img = self.pixmap.toImage()
-        img = img.transformed(transform)
-        self.pixmap = QPixmap.fromImage(img)
+        self.image = self.image.transformed(transform)
         w = self.window()
         if hasattr(w, '_update_size_label'):
             w._update_size_label()
@@ -2044,26 +2887,27 @@ class Canvas(QWidget):
         log.info("[flip_h] called")
         self.commit_selection()
         self.save_undo()
-        img = self.pixmap.toImage().mirrored(True, False)
-        self.pixmap = QPixmap.fromImage(img)
+        self.image = self.image.mirrored(True, False)
         self.update()
         self.set_modified()
 
     def flip_vertical(self):
         self.commit_selection()
         self.save_undo()
-        img = self.pixmap.toImage().mirrored(False, True)
-        self.pixmap = QPixmap.fromImage(img)
+        self.image = self.image.mirrored(False, True)
         self.update()
         self.set_modified()
 
     def load_image(self, path):
-        img = QImage(path)
+        return self.set_image(QImage(path))
+
+    def set_image(self, img):
+        """Replace the canvas with a decoded image, dropping history."""
         if img.isNull():
             return False
-        self.pixmap = QPixmap.fromImage(img)
-        self._undo_stack.clear()
-        self._redo_stack.clear()
+        self.end_stroke()
+        self.image = img
+        self._clear_history()
         self.center_canvas()
         w = self.window()
         if hasattr(w, '_update_size_label'):
@@ -2072,13 +2916,10 @@ class Canvas(QWidget):
         return True
 
     def new_canvas(self, w=DEFAULT_WIDTH, h=DEFAULT_HEIGHT):
-        self.pixmap = QPixmap(w, h)
-        self.pixmap.fill(Qt.transparent)
-        p = QPainter(self.pixmap)
-        p.fillRect(0, 0, w, h, Qt.white)
-        p.end()
-        self._undo_stack.clear()
-        self._redo_stack.clear()
+        self.end_stroke()
+        self.image = QImage(w, h, CANVAS_FORMAT)
+        self.image.fill(Qt.white)
+        self._clear_history()
         self.center_canvas()
         self.set_modified(False)
 
@@ -2099,11 +2940,17 @@ class ResizeDialog(QDialog):
         ("512 x 512", 512, 512),
         ("1024 x 1024", 1024, 1024),
     ]
-
-    def __init__(self, current_w, current_h, parent=None, pixmap=None):
+    # Leading run of blank RGBA8888 pixels (transparent, or white at any
+    # alpha), and the same for a row whose bytes are reversed
+    _BLANK_PIXELS = re.compile(
+        rb"(?:[\x00-\xff]{3}\x00|\xff\xff\xff[\x01-\xff])*")
+    _BLANK_PIXELS_REVERSED = re.compile(
+        rb"(?:\x00[\x00-\xff]{3}|[\x01-\xff]\xff\xff\xff)*")
+
+    def __init__(self, current_w, current_h, parent=None, image=None):
         super().__init__(parent)
         self.setWindowTitle("Resize Canvas")
-        self._pixmap = pixmap
+        self._image = image
         layout = QVBoxLayout(self)
 
         form = QGridLayout()
@@ -2149,40 +2996,59 @@ class ResizeDialog(QDialog):
         self.h_spin.setValue(h)
 
     def _on_trim(self):
-        if self._pixmap is None:
+        if self._image is None:
             return
-        img = self._pixmap.toImage().convertToFormat(QImage.Format_ARGB32)
-        w, h = img.width(), img.height()
-        # Use raw pixel data for speed (ARGB32: 4 bytes per pixel)
-        ptr = img.constBits()
-        ptr.setsize(h * img.bytesPerLine())
-        data = bytes(ptr)
-        bpl = img.bytesPerLine()
-        min_x, min_y, max_x, max_y = w, h, -1, -1
-        for y in range(h):
-            row_off = y * bpl
-            for x in range(w):
-                off = row_off + x * 4
-                b, g, r, a = data[off], data[off+1], data[off+2], data[off+3]
-                # Skip fully transparent or fully white pixels
-                if a == 0:
-                    continue
-                if r == 255 and g == 255 and b == 255:
-                    continue
-                if x < min_x:
-                    min_x = x
-                if x > max_x:
-                    max_x = x
-                if y < min_y:
-                    min_y = y
-                if y > max_y:
-                    max_y = y
-        if max_x < 0:
+        bounds = self._content_bounds()
+        if bounds is None:
             return
+        min_x, min_y, max_x, max_y = bounds
         self._trim_offset = (min_x, min_y)
         self.w_spin.setValue(max_x - min_x + 1)
         self.h_spin.setValue(max_y - min_y + 1)
 
+    def _content_bounds(self):
+        """Return (min_x, min_y, max_x, max_y) of the pixels that are
+        neither fully transparent nor white, or None if there are none.
+        """
+        if np is not None:
+            # A no-op for the canvas image, so its pixels are read in place.
+            # Premultiplied white at alpha a has a in every channel.
+            img = self._image.convertToFormat(CANVAS_FORMAT)
+            arr = _image_array(img, True)
+            if _content_bounds_jit is not None:
+                x0, y0, x1, y1 = _content_bounds_jit(arr)
+                return None if x1 < 0 else (x0, y0, x1, y1)
+            alpha = arr >> 24
+            content = (alpha != 0) & (arr != alpha * np.uint32(0x01010101))
+            rows = np.flatnonzero(content.any(axis=1))
+            if not len(rows):
+                return None
+            cols = np.flatnonzero(content.any(axis=0))
+            return int(cols[0]), int(rows[0]), int(cols[-1]), int(rows[-1])
+        # RGBA8888 stores bytes as R, G, B, A on every platform, unlike
+        # ARGB32 whose byte order follows the CPU's endianness
+        img = self._image.convertToFormat(QImage.Format_RGBA8888)
+        w, h = img.width(), img.height()
+        min_x, min_y, max_x, max_y = w, h, -1, -1
+        # The regex engine skips each row's blank margins in C; only the
+        # rows themselves are visited in Python
+        for y in range(h):
+            row = img.constScanLine(y).asstring(w * 4)
+            lead = self._BLANK_PIXELS.match(row).end() // 4
+            if lead == w:
+                continue
+            trail = self._BLANK_PIXELS_REVERSED.match(row[::-1]).end() // 4
+            if lead < min_x:
+                min_x = lead
+            if w - 1 - trail > max_x:
+                max_x = w - 1 - trail
+            if min_y == h:
+                min_y = y
+            max_y = y
+        if max_x < 0:
+            return None
+        return min_x, min_y, max_x, max_y
+
     def get_size(self):
         return self.w_spin.value(), self.h_spin.value()
 
@@ -2263,6 +3129,9 @@ class _InlineTextEditor(QPlainTextEdit):
 # ---------------------------------------------------------------------------
 # UI widgets
 # ---------------------------------------------------------------------------
+# Icons are drawn once per process; QIcon is implicitly shared, so every
+# window's buttons can hold the same instance.
+@lru_cache(maxsize=None)
 def _make_tool_icon(tool_type, size=24):
     """Draw a simple icon for each tool programmatically."""
     pm = QPixmap(size, size)
@@ -2397,6 +3266,7 @@ def _make_tool_icon(tool_type, size=24):
     return QIcon(pm)
 
 
+@lru_cache(maxsize=None)
 def _make_fill_mode_icon(mode, size=24):
     """Draw an icon for shape fill mode."""
     pm = QPixmap(size, size)
@@ -2421,6 +3291,7 @@ def _make_fill_mode_icon(mode, size=24):
     return QIcon(pm)
 
 
+@lru_cache(maxsize=None)
 def _make_undo_icon(size=24):
     """Draw a curved undo arrow."""
     pm = QPixmap(size, size)
@@ -2439,6 +3310,7 @@ def _make_undo_icon(size=24):
     return QIcon(pm)
 
 
+@lru_cache(maxsize=None)
 def _make_redo_icon(size=24):
     """Draw a curved redo arrow."""
     pm = QPixmap(size, size)
@@ -2457,6 +3329,34 @@ def _make_redo_icon(size=24):
     return QIcon(pm)
 
 
+# The palette shows each colour at one size, so a swatch repaint is a blit
+@lru_cache(maxsize=128)
+def _swatch_pixmap(rgba, size, dpr):
+    """Return a cached bordered swatch of the 0xAARRGGBB colour *rgba*."""
+    pm = QPixmap(round(size * dpr), round(size * dpr))
+    pm.setDevicePixelRatio(dpr)
+    pm.fill(Qt.transparent)
+    p = QPainter(pm)
+    p.setPen(QPen(QColor(128, 128, 128), 1))
+    p.setBrush(QBrush(QColor.fromRgba(rgba)))
+    p.drawRect(0, 0, size - 1, size - 1)
+    p.end()
+    return pm
+
+
+@lru_cache(maxsize=4)
+def _empty_swatch_pixmap(size, dpr):
+    """Return the dimmed white swatch shown in an unused palette slot."""
+    pm = QPixmap(round(size * dpr), round(size * dpr))
+    pm.setDevicePixelRatio(dpr)
+    pm.fill(Qt.transparent)
+    p = QPainter(pm)
+    p.setOpacity(0.3)
+    p.drawPixmap(0, 0, _swatch_pixmap(0xFFFFFFFF, size, dpr))
+    p.end()
+    return pm
+
+
 class ColorSwatch(QWidget):
     """Small clickable color swatch."""
     clicked = pyqtSignal(QColor, int)  # color, button (1=left, 2=right)
@@ -2464,23 +3364,56 @@ class ColorSwatch(QWidget):
     def __init__(self, color, parent=None, size=22):
         super().__init__(parent)
         self.color = QColor(color)
+        self.empty = False             # unused slot: dimmed, not clickable
         self.setFixedSize(size, size)
+        # Used swatches cover every pixel, so Qt need not erase first
+        self.setAttribute(Qt.WA_OpaquePaintEvent)
+
+    def set_empty(self, empty):
+        if empty != self.empty:
+            self.empty = empty
+            # The dimmed empty swatch lets the background show through
+            self.setAttribute(Qt.WA_OpaquePaintEvent, not empty)
+            self.update()
+
+    def set_color(self, color):
+        """Show *color*, repainting only if it differs from the current one."""
+        if color != self.color:
+            self.color = QColor(color)
+            self.update()
 
     def paintEvent(self, event):
         p = QPainter(self)
-        p.setPen(QPen(QColor(128, 128, 128), 1))
-        p.setBrush(QBrush(self.color))
-        p.drawRect(0, 0, self.width() - 1, self.height() - 1)
+        if self.empty:
+            pm = _empty_swatch_pixmap(self.width(), self.devicePixelRatioF())
+        else:
+            pm = _swatch_pixmap(self.color.rgba(), self.width(),
+                                self.devicePixelRatioF())
+        p.drawPixmap(0, 0, pm)
         p.end()
 
     def mousePressEvent(self, event):
+        if self.empty:
+            return
         btn = 1 if event.button() == Qt.LeftButton else 2
         self.clicked.emit(self.color, btn)
 
 
+def _swap_icon_path():
+    """Return the double-arrow swap icon drawn in ColorSelector's corner."""
+    path = QPainterPath()
+    for x0, y0, x1, y1 in ((34, 6, 44, 6), (44, 6, 41, 3), (44, 6, 41, 9),
+                           (44, 14, 34, 14), (34, 14, 37, 11),
+                           (34, 14, 37, 17)):
+        path.moveTo(x0, y0)
+        path.lineTo(x1, y1)
+    return path
+
+
 class ColorSelector(QWidget):
     """Shows FG/BG color with click-to-change and swap button."""
     color_changed = pyqtSignal()
+    _SWAP_ICON = _swap_icon_path()
 
     def __init__(self, parent=None):
         super().__init__(parent)
@@ -2493,28 +3426,22 @@ class ColorSelector(QWidget):
         p = QPainter(self)
         p.setRenderHint(QPainter.Antialiasing)
         # BG (bottom-right)
-        p.setPen(QPen(QColor(100, 100, 100), 1))
-        p.setBrush(QBrush(self.bg_color))
+        p.setPen(_pen(0xFF646464, 1))
+        p.setBrush(_brush(self.bg_color.rgba()))
         p.drawRect(16, 20, 28, 22)
         # FG (top-left, overlapping)
-        p.setBrush(QBrush(self.fg_color))
+        p.setBrush(_brush(self.fg_color.rgba()))
         p.drawRect(2, 2, 28, 22)
         # Swap icon (top-right corner)
-        p.setPen(QPen(QColor(80, 80, 80), 1.5))
+        p.setPen(_pen(0xFF505050, 1.5))
         p.setBrush(Qt.NoBrush)
-        # small double-arrow swap icon
-        p.drawLine(34, 6, 44, 6)
-        p.drawLine(44, 6, 41, 3)
-        p.drawLine(44, 6, 41, 9)
-        p.drawLine(44, 14, 34, 14)
-        p.drawLine(34, 14, 37, 11)
-        p.drawLine(34, 14, 37, 17)
+        p.drawPath(self._SWAP_ICON)
         p.end()
 
     def mousePressEvent(self, event):
         # Check if click is in the swap area (top-right)
         if event.x() >= 30 and event.y() <= 20:
-            self.fg_color, self.bg_color = QColor(self.bg_color), QColor(self.fg_color)
+            self.fg_color, self.bg_color = self.bg_color, self.fg_color
             self.color_changed.emit()
             self.update()
             return
@@ -2555,8 +3482,7 @@ class ColorPalette(QWidget):
         # Row 2: recent colour slots (initially empty/dim)
         for col in range(self.MAX_RECENT):
             sw = ColorSwatch("#FFFFFF", size=swatch_size)
-            sw.setEnabled(False)
-            sw.setStyleSheet("QWidget:disabled { opacity: 0.3; }")
+            sw.set_empty(True)
             sw.clicked.connect(self._on_swatch)
             self._grid.addWidget(sw, 2, col)
             self._recent_swatches.append(sw)
@@ -2565,20 +3491,14 @@ class ColorPalette(QWidget):
         """Add a colour to the recent row (no duplicates, most recent first)."""
         c = QColor(color)
         hex_val = c.name()
-        self._recent_colors = [x for x in self._recent_colors if x != hex_val]
-        self._recent_colors.insert(0, hex_val)
-        self._recent_colors = self._recent_colors[:self.MAX_RECENT]
+        if self._recent_colors[:1] == [hex_val]:
+            return
+        self._recent_colors = list(dict.fromkeys(
+            [hex_val, *self._recent_colors]))[:self.MAX_RECENT]
         for i, sw in enumerate(self._recent_swatches):
-            if i < len(self._recent_colors):
-                sw.color = QColor(self._recent_colors[i])
-                sw.setEnabled(True)
-                sw.setStyleSheet("")
-                sw.update()
-            else:
-                sw.color = QColor("#FFFFFF")
-                sw.setEnabled(False)
-                sw.setStyleSheet("QWidget:disabled { opacity: 0.3; }")
-                sw.update()
+            used = i < len(self._recent_colors)
+            sw.set_color(QColor(self._recent_colors[i] if used else "#FFFFFF"))
+            sw.set_empty(not used)
 
     def _on_swatch(self, color, button):
         self.color_picked.emit(color, button)
@@ -2596,7 +3516,9 @@ class BrushSizeSelector(QWidget):
 
         self._preview = QWidget()
         self._preview.setFixedSize(34, 34)
+        self._preview.setAttribute(Qt.WA_OpaquePaintEvent)
         self._preview.paintEvent = self._paint_preview
+        self._preview_frame = None     # white fill + border, see below
         layout.addWidget(self._preview, alignment=Qt.AlignHCenter)
 
         self.spin = QSpinBox()
@@ -2607,20 +3529,31 @@ class BrushSizeSelector(QWidget):
         layout.addWidget(self.spin, alignment=Qt.AlignHCenter)
 
     def _paint_preview(self, event):
+        dpr = self._preview.devicePixelRatioF()
+        frame = self._preview_frame
+        if frame is None or frame.devicePixelRatio() != dpr:
+            frame = QPixmap(self._preview.size() * dpr)
+            frame.setDevicePixelRatio(dpr)
+            fp = QPainter(frame)
+            fp.setRenderHint(QPainter.Antialiasing)
+            fp.fillRect(self._preview.rect(), QColor(255, 255, 255))
+            fp.setPen(QPen(QColor(200, 200, 200), 1))
+            fp.drawRect(0, 0, 33, 33)
+            fp.end()
+            self._preview_frame = frame
         p = QPainter(self._preview)
         p.setRenderHint(QPainter.Antialiasing)
-        p.fillRect(self._preview.rect(), QColor(255, 255, 255))
-        p.setPen(QPen(QColor(200, 200, 200), 1))
-        p.drawRect(0, 0, 33, 33)
+        p.drawPixmap(0, 0, frame)
         size = self.spin.value()
         r = min(size, 30) / 2.0
         p.setPen(Qt.NoPen)
-        p.setBrush(QBrush(QColor(0, 0, 0)))
+        p.setBrush(_brush(0xFF000000))
         p.drawEllipse(QPointF(17, 17), r, r)
         p.end()
 
     def _on_value(self, v):
-        self._preview.update()
+        # The dot (at most 30 px across) stays inside the border
+        self._preview.update(QRect(1, 1, 32, 32))
         self.size_changed.emit(v)
 
 
@@ -2661,16 +3594,37 @@ class ShapeFillSelector(QWidget):
 # Main window
 # ---------------------------------------------------------------------------
 class PaintApp(QMainWindow):
+    # Emitted from the file worker; queued to the GUI thread
+    _save_finished = pyqtSignal()
+    _load_finished = pyqtSignal(str, QImage)
+    _save_executor = None
+
     def __init__(self):
         super().__init__()
         self.setWindowTitle(APP_NAME)
         self.resize(1100, 750)
 
         self._file_path = None
+        self._pending_save = None      # (future, path, canvas image_key())
+        self._action_slots = {}        # QAction -> slot, see _add_action
+        self._settings = QSettings("ClaudePaint", "Claude Paint")
+        # Status bar labels, created by _build_status_bar
+        self._tool_label = None
+        self._brush_label = None
+        self._save_finished.connect(self._finish_save)
+        self._load_finished.connect(self._apply_loaded_image)
 
         # Canvas as central widget (offset-based pan, no scroll area)
         self.canvas = Canvas()
         self.setCentralWidget(self.canvas)
+        self._selection_tool = self.canvas._tools[ToolType.SELECTION]
+
+        # The current colour is added to the palette's recent row on the
+        # next event-loop turn, so a burst of picks reshuffles it once
+        self._recent_timer = QTimer(self)
+        self._recent_timer.setSingleShot(True)
+        self._recent_timer.setInterval(0)
+        self._recent_timer.timeout.connect(self._add_recent_color)
 
         # Connect canvas signals
         self.canvas.color_changed.connect(self._sync_colors_from_canvas)
@@ -2752,18 +3706,15 @@ class PaintApp(QMainWindow):
         tools_grid.setSpacing(1)
         tools_grid.setContentsMargins(0, 0, 0, 0)
 
-        all_tools = []
-        for _, tools in TOOL_GROUPS:
-            all_tools.extend(tools)
-
-        for i, tt in enumerate(all_tools):
+        icon_size = QSize(28, 28)
+        for i, tt in enumerate(ALL_TOOLS):
             shortcut_key = TOOL_SHORTCUT_LABELS.get(tt, "")
             tool_name = self.canvas._tools[tt].name
             tip = f"{tool_name} ({shortcut_key})" if shortcut_key else tool_name
 
             btn = QToolButton()
             btn.setIcon(_make_tool_icon(tt, size=28))
-            btn.setIconSize(QSize(28, 28))
+            btn.setIconSize(icon_size)
             btn.setFixedSize(34, 34)
             btn.setCheckable(True)
             btn.setToolTip(tip)
@@ -2838,12 +3789,13 @@ class PaintApp(QMainWindow):
         for tt, btn in self._tool_buttons.items():
             btn.setChecked(tt == tool_type)
         self.canvas.set_tool(tool_type)
-        if hasattr(self, '_tool_label'):
+        if self._tool_label is not None:
             self._tool_label.setText(self.canvas._tools[tool_type].name)
 
     def _on_brush_size(self, size):
         self.canvas.brush_size = size
-        if hasattr(self, '_brush_label'):
+        self.canvas.update_cursor()
+        if self._brush_label is not None:
             self._brush_label.setText(f"Size: {size}")
 
     def _on_brush_size_from_canvas(self, size):
@@ -2851,7 +3803,7 @@ class PaintApp(QMainWindow):
         self._brush_size_sel.spin.setValue(size)
         self._brush_size_sel.spin.blockSignals(False)
         self._brush_size_sel._preview.update()
-        if hasattr(self, '_brush_label'):
+        if self._brush_label is not None:
             self._brush_label.setText(f"Size: {size}")
 
     def _on_shape_fill_mode(self, mode):
@@ -2862,22 +3814,27 @@ class PaintApp(QMainWindow):
 
     def _on_palette_pick(self, color, button):
         if button == 1:
-            self._color_sel.fg_color = QColor(color)
+            self._color_sel.fg_color = color
         else:
-            self._color_sel.bg_color = QColor(color)
+            self._color_sel.bg_color = color
         self._color_sel.update()
         self._sync_colors_to_canvas()
 
+    # Colours are shared between the selector, the canvas and the palette
+    # rather than copied: all of them replace a QColor, never modify one.
     def _sync_colors_to_canvas(self):
-        self.canvas.fg_color = QColor(self._color_sel.fg_color)
-        self.canvas.bg_color = QColor(self._color_sel.bg_color)
-        self._palette.add_color(self._color_sel.fg_color)
+        self.canvas.fg_color = self._color_sel.fg_color
+        self.canvas.bg_color = self._color_sel.bg_color
+        self._recent_timer.start()
 
     def _sync_colors_from_canvas(self):
-        self._color_sel.fg_color = QColor(self.canvas.fg_color)
-        self._color_sel.bg_color = QColor(self.canvas.bg_color)
+        self._color_sel.fg_color = self.canvas.fg_color
+        self._color_sel.bg_color = self.canvas.bg_color
         self._color_sel.update()
-        self._palette.add_color(self.canvas.fg_color)
+        self._recent_timer.start()
+
+    def _add_recent_color(self):
+        self._palette.add_color(self._color_sel.fg_color)
 
     def _edit_colors(self):
         c = QColorDialog.getColor(self._color_sel.fg_color, self, "Edit Colors")
@@ -2938,22 +3895,30 @@ class PaintApp(QMainWindow):
 
     def _add_action(self, menu, text, slot, shortcut=None):
         action = menu.addAction(text)
-        def _handler(checked=False, _s=slot, _t=text):
-            log.info(f"[action] {_t}")
-            try:
-                _s()
-            except Exception as e:
-                log.error(f"[action ERROR] {_t}: {e}", exc_info=True)
-        action.triggered.connect(_handler)
+        action.setData(text)
+        self._action_slots[action] = slot
+        action.triggered.connect(self._dispatch_action)
         if shortcut:
             action.setShortcut(shortcut)
             action.setShortcutContext(Qt.ApplicationShortcut)
             self.addAction(action)
         return action
 
+    def _dispatch_action(self):
+        """Run the slot of the menu action that was triggered, logging it."""
+        action = self.sender()
+        text = action.data()
+        if log.isEnabledFor(logging.INFO):
+            log.info(f"[action] {text}")
+        try:
+            self._action_slots[action]()
+        except Exception as e:
+            log.error(f"[action ERROR] {text}: {e}", exc_info=True)
+
     # ---- File actions ----
     def _check_save(self):
         """Returns True if OK to proceed (user saved or discarded)."""
+        self._finish_save(wait=True)
         if not self.canvas.modified:
             return True
         ret = QMessageBox.question(
@@ -2962,7 +3927,7 @@ class PaintApp(QMainWindow):
             QMessageBox.Save | QMessageBox.Discard | QMessageBox.Cancel,
         )
         if ret == QMessageBox.Save:
-            return self._file_save()
+            return self._file_save() and self._finish_save(wait=True)
         return ret == QMessageBox.Discard
 
     def _file_new(self):
@@ -2987,10 +3952,34 @@ class PaintApp(QMainWindow):
     def open_file(self, path):
         """Load an image file into the canvas."""
         log.info(f"[open] Loading: {path}")
+        # A save still running would set _file_path when it finishes
+        self._finish_save(wait=True)
         if self.canvas.load_image(path):
             self._file_path = path
             self._update_title()
-            log.info(f"[open] OK: {self.canvas.pixmap.width()}x{self.canvas.pixmap.height()}")
+            log.info(f"[open] OK: {self.canvas.image.width()}x{self.canvas.image.height()}")
+        else:
+            log.error(f"[open] Failed to load: {path}")
+            QMessageBox.warning(self, APP_NAME, f"Could not open {path}")
+
+    def open_file_async(self, path):
+        """Like open_file, but decode on the file worker so the window can
+        paint first.  Used for the file named on the command line."""
+        log.info(f"[open] Loading in background: {path}")
+        future = self._file_worker().submit(QImage, path)
+        future.add_done_callback(
+            lambda f: self._load_finished.emit(path, f.result()))
+
+    def _apply_loaded_image(self, path, img):
+        # The window is usable while the file decodes; if the user has
+        # already drawn something, ask before replacing it
+        if not self._check_save():
+            log.info(f"[open] Kept the current image instead of {path}")
+            return
+        if self.canvas.set_image(img):
+            self._file_path = path
+            self._update_title()
+            log.info(f"[open] OK: {img.width()}x{img.height()}")
         else:
             log.error(f"[open] Failed to load: {path}")
             QMessageBox.warning(self, APP_NAME, f"Could not open {path}")
@@ -3006,10 +3995,8 @@ class PaintApp(QMainWindow):
             self, "Save Image", start_dir,
             "PNG (*.png);;JPEG (*.jpg *.jpeg);;BMP (*.bmp);;All Files (*)")
         if path:
-            if self._save_to(path):
-                self._file_path = path
-                self._update_title()
-                return True
+            # _finish_save records the path once the file is written
+            return self._save_to(path)
         return False
 
     def _save_to(self, path):
@@ -3019,10 +4006,42 @@ class PaintApp(QMainWindow):
         if ext.lower() not in ('.png', '.jpg', '.jpeg', '.bmp'):
             path += '.png'
         log.info(f"[save] Saving to {path}")
+        self.canvas.end_stroke()
         self.canvas.commit_selection()
-        if self.canvas.pixmap.save(path):
+        self._finish_save(wait=True)
+        # Encoding runs on the worker while editing continues.  The copy
+        # shares the canvas pixels until the next edit detaches them.
+        img = QImage(self.canvas.image)
+        future = self._file_worker().submit(img.save, path)
+        self._pending_save = (future, path, self.canvas.image_key())
+        future.add_done_callback(lambda f: self._save_finished.emit())
+        return True
+
+    @classmethod
+    def _file_worker(cls):
+        # One thread, so a save never races a load of the same file
+        if cls._save_executor is None:
+            cls._save_executor = ThreadPoolExecutor(max_workers=1)
+        return cls._save_executor
+
+    def _finish_save(self, wait=False):
+        """Report the outcome of the background save started by _save_to.
+
+        Waits for it if *wait* is set, otherwise does nothing while it is
+        still running.  Returns False only if a save failed.
+        """
+        if self._pending_save is None:
+            return True
+        future, path, key = self._pending_save
+        if not (wait or future.done()):
+            return True
+        self._pending_save = None
+        if future.result():
             log.info("[save] OK")
-            self.canvas.set_modified(False)
+            self._file_path = path
+            # Edits made while encoding are not in the file
+            if self.canvas.image_key() == key:
+                self.canvas.set_modified(False)
             self._update_title()
             return True
         log.error(f"[save] FAILED: {path}")
@@ -3032,12 +4051,12 @@ class PaintApp(QMainWindow):
     # ---- Edit actions ----
     def _edit_cut(self):
         tool = self.canvas.current_tool()
-        if isinstance(tool, SelectionTool) and tool.has_selection():
+        if tool.supports_selection and tool.has_selection():
             tool.cut_selection()
 
     def _edit_copy(self):
         tool = self.canvas.current_tool()
-        if isinstance(tool, SelectionTool) and tool.has_selection():
+        if tool.supports_selection and tool.has_selection():
             tool.copy_selection()
 
     def _edit_paste(self):
@@ -3046,7 +4065,7 @@ class PaintApp(QMainWindow):
             log.info(f"[paste] Got image: {pm.width()}x{pm.height()}")
             # Switch to selection tool and paste as floating selection
             self._on_tool_selected(ToolType.SELECTION)
-            sel_tool = self.canvas._tools[ToolType.SELECTION]
+            sel_tool = self._selection_tool
             # Paste at cursor position if cursor is over the canvas
             mp = self.canvas._mouse_pos
             if mp.x() >= 0 and self.canvas._is_over_canvas(mp):
@@ -3071,24 +4090,29 @@ class PaintApp(QMainWindow):
     def _pixmap_from_clipboard():
         """Try multiple methods to get an image from the system clipboard."""
         clipboard = QApplication.clipboard()
-        # Method 1: clipboard.image() — most reliable on Linux
+        mime = clipboard.mimeData()
+        # Method 1: decode encoded bytes once, with the format known from
+        # the mime type, before clipboard.image() picks and decodes one
+        if mime:
+            for fmt in ('png', 'bmp', 'jpeg'):
+                if mime.hasFormat('image/' + fmt):
+                    data = mime.data('image/' + fmt)
+                    if data and not data.isEmpty():
+                        buf = QBuffer(data)
+                        reader = QImageReader(buf, fmt.encode())
+                        reader.setAutoDetectImageFormat(False)
+                        img = reader.read()
+                        if not img.isNull():
+                            return QPixmap.fromImage(img)
+        # Method 2: clipboard.image() — most reliable on Linux
         img = clipboard.image()
         if img and not img.isNull():
             return QPixmap.fromImage(img)
-        # Method 2: clipboard.pixmap()
+        # Method 3: clipboard.pixmap()
         pm = clipboard.pixmap()
         if pm and not pm.isNull():
             return pm
-        # Method 3: read raw bytes from mime data (browser copies, etc.)
-        mime = clipboard.mimeData()
         if mime:
-            for fmt in ('image/png', 'image/jpeg', 'image/bmp'):
-                if mime.hasFormat(fmt):
-                    data = mime.data(fmt)
-                    if data and not data.isEmpty():
-                        img = QImage()
-                        if img.loadFromData(data):
-                            return QPixmap.fromImage(img)
             # Method 4: imageData() QVariant conversion
             if mime.hasImage():
                 data = mime.imageData()
@@ -3100,19 +4124,18 @@ class PaintApp(QMainWindow):
 
     def _edit_select_all(self):
         self._on_tool_selected(ToolType.SELECTION)
-        sel_tool = self.canvas._tools[ToolType.SELECTION]
-        sel_tool.select_all()
+        self._selection_tool.select_all()
 
     def _edit_delete(self):
         tool = self.canvas.current_tool()
-        if isinstance(tool, SelectionTool) and tool.has_selection():
+        if tool.supports_selection and tool.has_selection():
             tool.delete_selection()
 
     # ---- Image actions ----
     def _image_resize(self):
-        dlg = ResizeDialog(self.canvas.pixmap.width(),
-                           self.canvas.pixmap.height(), self,
-                           pixmap=self.canvas.pixmap)
+        dlg = ResizeDialog(self.canvas.image.width(),
+                           self.canvas.image.height(), self,
+                           image=self.canvas.image)
         if dlg.exec_() == QDialog.Accepted:
             w, h = dlg.get_size()
             trim = dlg.get_trim_offset()
@@ -3120,12 +4143,9 @@ class PaintApp(QMainWindow):
                 # Trim: crop to content bounding box
                 self.canvas.commit_selection()
                 self.canvas.save_undo()
-                new_pm = QPixmap(w, h)
-                new_pm.fill(Qt.transparent)
-                p = QPainter(new_pm)
-                p.drawPixmap(-trim[0], -trim[1], self.canvas.pixmap)
-                p.end()
-                self.canvas.pixmap = new_pm
+                # A plain row copy; any area past the image edges (if the
+                # size was enlarged after trimming) comes out transparent
+                self.canvas.image = self.canvas.image.copy(trim[0], trim[1], w, h)
                 self.canvas.update()
                 self.canvas.set_modified()
             else:
@@ -3139,7 +4159,7 @@ class PaintApp(QMainWindow):
         self._tool_label = QLabel("Pencil")
         self._brush_label = QLabel(f"Size: {self.canvas.brush_size}")
         self._size_label = QPushButton(
-            f"{self.canvas.pixmap.width()} x {self.canvas.pixmap.height()} px")
+            f"{self.canvas.image.width()} x {self.canvas.image.height()} px")
         self._size_label.setFlat(True)
         self._size_label.setCursor(Qt.PointingHandCursor)
         self._size_label.setStyleSheet(
@@ -3182,7 +4202,7 @@ class PaintApp(QMainWindow):
 
     def _update_size_label(self):
         self._size_label.setText(
-            f"{self.canvas.pixmap.width()} x {self.canvas.pixmap.height()} px")
+            f"{self.canvas.image.width()} x {self.canvas.image.height()} px")
 
     # ---- Title ----
     def _update_title(self):
@@ -3255,12 +4275,15 @@ class PaintApp(QMainWindow):
 
     # ---- Window geometry persistence ----
     def _save_geometry(self):
-        settings = QSettings("ClaudePaint", "Claude Paint")
-        settings.setValue("geometry", self.saveGeometry())
+        # QSettings rewrites its store for any setValue, even a no-op one
+        geom = self.saveGeometry()
+        if geom != self._saved_geometry:
+            self._saved_geometry = geom
+            self._settings.setValue("geometry", geom)
 
     def _restore_geometry(self):
-        settings = QSettings("ClaudePaint", "Claude Paint")
-        geom = settings.value("geometry")
+        geom = self._settings.value("geometry")
+        self._saved_geometry = geom
         if geom:
             self.restoreGeometry(geom)
 
@@ -3268,6 +4291,7 @@ class PaintApp(QMainWindow):
     def closeEvent(self, event):
         if self._check_save():
             self._save_geometry()
+            self._settings.sync()
             event.accept()
         else:
             event.ignore()
@@ -3276,18 +4300,106 @@ class PaintApp(QMainWindow):
 # ---------------------------------------------------------------------------
 # Entry point
 # ---------------------------------------------------------------------------
-import logging, os
+import atexit, logging, logging.handlers, os, queue, threading
+
+
+class _BatchedFileHandler(logging.FileHandler):
+    """FileHandler that leaves records in the stream's buffer for up to
+    FLUSH_DELAY seconds instead of flushing after each one.
+
+    Warnings and errors are flushed at once, so a traceback reaches the
+    file even if the process dies right after logging it.
+    """
+    FLUSH_DELAY = 1.0
+
+    def __init__(self, filename):
+        super().__init__(filename)
+        self._flush_timer = None       # False once closed
+
+    def emit(self, record):
+        super().emit(record)
+        if record.levelno >= logging.WARNING:
+            self._flush_now()
+
+    def flush(self):
+        # Called by StreamHandler.emit after every record
+        with self.lock:
+            if self._flush_timer is None:
+                self._flush_timer = threading.Timer(self.FLUSH_DELAY,
+                                                    self._flush_now)
+                self._flush_timer.daemon = True
+                self._flush_timer.start()
+
+    def _flush_now(self):
+        with self.lock:
+            if self._flush_timer:
+                self._flush_timer.cancel()
+            if self._flush_timer is not False:
+                self._flush_timer = None
+            super().flush()
+
+    def close(self):
+        with self.lock:
+            if self._flush_timer:
+                self._flush_timer.cancel()
+            self._flush_timer = False
+        super().close()                # closing the stream flushes it
+
+
+class _LogFormatter(logging.Formatter):
+    """"%(asctime)s %(message)s" with the date and time part reused for
+    every record logged within the same second."""
+
+    def __init__(self):
+        super().__init__("%(asctime)s %(message)s")
+        self._second = None
+        self._stamp = ""
+
+    def formatTime(self, record, datefmt=None):
+        second = int(record.created)
+        if second != self._second:
+            self._second = second
+            self._stamp = time.strftime(self.default_time_format,
+                                        self.converter(second))
+        return self.default_msec_format % (self._stamp, record.msecs)
+
+    def format(self, record):
+        if record.exc_info or record.exc_text or record.stack_info:
+            return super().format(record)
+        # QueueHandler.prepare() has already merged args and any traceback
+        # into msg, so this is the usual case on the listener thread
+        return f"{self.formatTime(record)} {record.getMessage()}"
+
+
 _log_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), "debug.log")
-logging.basicConfig(filename=_log_path, level=logging.DEBUG,
-                    format="%(asctime)s %(message)s", force=True)
 log = logging.getLogger("paint")
+if os.environ.get("CLAUDEPAINT_DEBUG", "0") != "0":
+    # Records are queued on the calling (GUI) thread and written to the
+    # file by a listener thread, so a slow disk never stalls the event loop
+    _log_file = _BatchedFileHandler(_log_path)
+    _log_file.setFormatter(_LogFormatter())
+    _log_queue = queue.SimpleQueue()
+    _log_listener = logging.handlers.QueueListener(_log_queue, _log_file)
+    _log_listener.start()
+    atexit.register(_log_listener.stop)     # flushes what is still queued
+    _log_enqueue = logging.handlers.QueueHandler(_log_queue)
+    _log_enqueue.setFormatter(logging.Formatter("%(message)s"))
+    logging.basicConfig(level=logging.DEBUG, handlers=[_log_enqueue],
+                        force=True)
+else:
+    # No debug.log: debug and info calls return before building a record.
+    # Warnings and errors still propagate; with no handlers configured,
+    # logging's last-resort handler prints them to stderr.
+    log.setLevel(logging.WARNING)
 
 
 def main():
-    import traceback
     def _excepthook(t, v, tb):
-        log.error("".join(traceback.format_exception(t, v, tb)))
-        sys.__excepthook__(t, v, tb)
+        # The traceback is only formatted if a handler actually emits it
+        log.error("Uncaught exception", exc_info=(t, v, tb))
+        if log.hasHandlers():
+            # Otherwise the last-resort handler has already printed it
+            sys.__excepthook__(t, v, tb)
     sys.excepthook = _excepthook
     log.info("Starting (v4)")
     print("[Claude Paint] Starting (v4)...", flush=True)
@@ -3295,9 +4407,10 @@ def main():
     app.setApplicationName(APP_NAME)
     window = PaintApp()
     window.show()
+    QTimer.singleShot(0, _warm_up_kernels)
     # Load file from command line: ./claude-paint image.png
     if len(sys.argv) > 1:
-        window.open_file(sys.argv[1])
+        window.open_file_async(sys.argv[1])
     sys.exit(app.exec_())
 
 
@@ -0,0 +1,164 @@
+import unittest
+from unittest import mock
+
+from PyQt5.QtGui import QColor
+
+from util import MouseEvent, claudepaint, close_window, make_window, settle
+
+
+class CanvasTestCase(unittest.TestCase):
+    def setUp(self):
+        self.window = make_window()
+        self.canvas = self.window.canvas
+
+    def tearDown(self):
+        close_window(self.window)
+
+    def shown_color(self, x, y):
+        """Colour of widget pixel (x, y) as actually painted."""
+        self.canvas.repaint()
+        return self.canvas.grab().toImage().pixelColor(x, y)
+
+    def stroke(self, tool_type, points, release=True):
+        self.window._on_tool_selected(tool_type)
+        tool = self.canvas.current_tool()
+        tool.mouse_press(MouseEvent(*points[0]))
+        for pt in points[1:]:
+            tool.mouse_move(MouseEvent(*pt))
+        if release:
+            tool.mouse_release(MouseEvent(*points[-1]))
+        settle()
+        return tool
+
+
+class BackgroundCacheTest(CanvasTestCase):
+    def test_brush_stroke_is_shown_during_and_after_drag(self):
+        # Repaint twice between moves so the composed background is cached
+        # while the stroke painter is still open on the image
+        self.canvas.brush_size = 5
+        tool = self.stroke(claudepaint.ToolType.BRUSH,
+                           [(50, 50), (55, 50), (60, 50)], release=False)
+        self.canvas.repaint()
+        self.canvas.repaint()
+        for x in range(62, 120, 2):
+            tool.mouse_move(MouseEvent(x, 50))
+        settle()
+        self.assertEqual(QColor(self.canvas.image.pixel(100, 50)),
+                         QColor(0, 0, 0))
+        self.assertEqual(self.shown_color(100, 50), QColor(0, 0, 0))
+        tool.mouse_release(MouseEvent(118, 50))
+        settle()
+        self.assertEqual(self.shown_color(100, 50), QColor(0, 0, 0))
+
+
+class OpaqueCacheTest(CanvasTestCase):
+    @unittest.skipIf(claudepaint.np is None, "the opaque scan needs NumPy")
+    def test_checkerboard_returns_under_alpha_brush_stroke(self):
+        # Start the stroke off the image so the opaque scan runs, and is
+        # cached, before any pixel turns transparent
+        self.canvas.brush_size = 9
+        tool = self.stroke(claudepaint.ToolType.ALPHA_BRUSH,
+                           [(-20, -20)], release=False)
+        self.canvas.repaint()
+        self.assertTrue(self.canvas._image_opaque(self.canvas.rect()))
+        for x in range(0, 120, 4):
+            tool.mouse_move(MouseEvent(x, 50))
+        tool.mouse_release(MouseEvent(120, 50))
+        settle()
+        self.assertEqual(QColor.fromRgba(self.canvas.image.pixel(60, 50))
+                         .alpha(), 0)
+        shown = self.shown_color(60, 50)
+        self.canvas._opaque_cache = (None, False)
+        self.canvas._background_cache = (None, None)
+        self.assertEqual(shown, self.shown_color(60, 50))
+        self.assertNotEqual(shown, QColor(128, 128, 128))
+
+
+class StrokeInterruptTest(CanvasTestCase):
+    def test_undo_during_drag_restores_image(self):
+        self.canvas.brush_size = 5
+        tool = self.stroke(claudepaint.ToolType.BRUSH,
+                           [(20, 20), (60, 20), (100, 20)], release=False)
+        self.assertEqual(QColor(self.canvas.image.pixel(60, 20)),
+                         QColor(0, 0, 0))
+        self.canvas.undo()
+        self.assertEqual(QColor(self.canvas.image.pixel(60, 20)),
+                         QColor(255, 255, 255))
+        # The rest of the drag no longer draws
+        tool.mouse_move(MouseEvent(100, 60))
+        tool.mouse_release(MouseEvent(100, 60))
+        settle()
+        self.assertEqual(QColor(self.canvas.image.pixel(100, 40)),
+                         QColor(255, 255, 255))
+        self.canvas.redo()
+        self.assertEqual(QColor(self.canvas.image.pixel(60, 20)),
+                         QColor(0, 0, 0))
+
+
+class UndoTest(CanvasTestCase):
+    def edit(self, i):
+        canvas = self.canvas
+        kind = i % 5
+        if kind in (0, 1):
+            self.stroke(claudepaint.ToolType.BRUSH,
+                        [(10 + i * 7, 10), (40 + i * 7, 80 + i)])
+        elif kind == 2:
+            self.window._on_tool_selected(claudepaint.ToolType.FILL)
+            canvas.fg_color = QColor(i * 20 % 255, 0, 0)
+            canvas.current_tool().mouse_press(MouseEvent(300, 200))
+        elif kind == 3:
+            canvas.rotate(90)
+        else:
+            self.window._on_tool_selected(claudepaint.ToolType.SELECTION)
+            tool = canvas.current_tool()
+            for a, b in (((5, 5), (60, 60)), ((30, 30), (80, 50))):
+                tool.mouse_press(MouseEvent(*a))
+                tool.mouse_move(MouseEvent(*b))
+                tool.mouse_release(MouseEvent(*b))
+            canvas.commit_selection()
+
+    def check_history(self):
+        canvas = self.canvas
+        canvas.new_canvas(400, 300)
+        states = [canvas.image.copy()]
+        for i in range(12):
+            self.edit(i)
+            if canvas.image != states[-1]:
+                states.append(canvas.image.copy())
+        for state in reversed(states[1:]):
+            self.assertEqual(canvas.image, state)
+            canvas.undo()
+        self.assertEqual(canvas.image, states[0])
+        for state in states[1:]:
+            canvas.redo()
+            self.assertEqual(canvas.image, state)
+
+    def test_undo_redo_restore_every_state(self):
+        self.check_history()
+
+    def test_undo_redo_without_numpy(self):
+        with mock.patch.object(claudepaint, "np", None):
+            self.check_history()
+
+
+class FillNoOpTest(CanvasTestCase):
+    def test_fill_that_changes_nothing_leaves_document_alone(self):
+        self.canvas.new_canvas(40, 30)
+        self.canvas.image.fill(0)
+        self.stroke(claudepaint.ToolType.BRUSH, [(5, 5), (10, 5)])
+        self.canvas.undo()
+        self.canvas.set_modified(False)
+        key = self.canvas.image_key()
+        # Transparent red premultiplies to the same pixel as the canvas
+        self.window._on_tool_selected(claudepaint.ToolType.FILL)
+        self.canvas.fg_color = QColor(255, 0, 0, 0)
+        self.canvas.current_tool().mouse_press(MouseEvent(20, 20))
+        self.assertFalse(self.canvas.modified)
+        self.assertEqual(self.canvas.image_key(), key)
+        self.canvas.redo()
+        self.assertEqual(QColor(self.canvas.image.pixel(8, 5)),
+                         QColor(0, 0, 0))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,105 @@
+import os
+import shutil
+import tempfile
+import unittest
+from unittest import mock
+
+from PyQt5.QtGui import QColor, QImage
+
+from util import MouseEvent, claudepaint, close_window, make_window, settle
+
+
+class FileTestCase(unittest.TestCase):
+    def setUp(self):
+        self.window = make_window()
+        self.canvas = self.window.canvas
+        self.dir = tempfile.mkdtemp()
+        self.warnings = []
+        patcher = mock.patch.object(
+            claudepaint.QMessageBox, "warning",
+            lambda parent, title, text: self.warnings.append(text))
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def tearDown(self):
+        close_window(self.window)
+        shutil.rmtree(self.dir)
+
+    def save_as(self, path):
+        with mock.patch.object(claudepaint.QFileDialog, "getSaveFileName",
+                               return_value=(path, "")):
+            result = self.window._file_save_as()
+        self.window._finish_save(wait=True)
+        return result
+
+    def draw(self):
+        self.window._on_tool_selected(claudepaint.ToolType.BRUSH)
+        tool = self.canvas.current_tool()
+        tool.mouse_press(MouseEvent(10, 10))
+        tool.mouse_move(MouseEvent(40, 10))
+        tool.mouse_release(MouseEvent(40, 10))
+
+
+class SaveTest(FileTestCase):
+    def test_save_as_records_path_once_written(self):
+        self.draw()
+        path = os.path.join(self.dir, "out")
+        self.assertTrue(self.save_as(path))
+        self.assertEqual(self.window._file_path, path + ".png")
+        self.assertTrue(os.path.exists(path + ".png"))
+        self.assertFalse(self.canvas.modified)
+        self.assertFalse(self.warnings)
+
+    def test_failed_save_as_keeps_previous_path(self):
+        self.draw()
+        self.save_as(os.path.join(self.dir, "missing", "out.png"))
+        self.assertIsNone(self.window._file_path)
+        self.assertTrue(self.canvas.modified)
+        self.assertEqual(len(self.warnings), 1)
+
+    def test_edit_during_save_keeps_modified(self):
+        self.draw()
+        self.window._save_to(os.path.join(self.dir, "out.png"))
+        self.draw()
+        self.window._finish_save(wait=True)
+        self.assertTrue(self.canvas.modified)
+
+
+class AsyncOpenTest(FileTestCase):
+    def setUp(self):
+        super().setUp()
+        self.path = os.path.join(self.dir, "in.png")
+        img = QImage(30, 20, claudepaint.CANVAS_FORMAT)
+        img.fill(QColor(0, 0, 255))
+        img.save(self.path)
+
+    def open_async(self, answer=None):
+        with mock.patch.object(claudepaint.QMessageBox, "question",
+                               return_value=answer) as question:
+            self.window.open_file_async(self.path)
+            self.window._file_worker().submit(lambda: None).result()
+            settle()
+        return question.called
+
+    def test_loads_into_untouched_canvas(self):
+        self.assertFalse(self.open_async())
+        self.assertEqual(self.canvas.image.size().width(), 30)
+        self.assertEqual(self.window._file_path, self.path)
+
+    def test_cancel_keeps_drawing_made_during_load(self):
+        self.draw()
+        self.assertTrue(self.open_async(claudepaint.QMessageBox.Cancel))
+        self.assertNotEqual(self.canvas.image.width(), 30)
+        self.assertEqual(QColor(self.canvas.image.pixel(25, 10)),
+                         QColor(0, 0, 0))
+        self.assertIsNone(self.window._file_path)
+
+    def test_discard_replaces_drawing(self):
+        self.draw()
+        self.assertTrue(self.open_async(claudepaint.QMessageBox.Discard))
+        self.assertEqual(self.canvas.image.width(), 30)
+        self.assertEqual(self.window._file_path, self.path)
+
+
+if __name__ == "__main__":
+    unittest.main()
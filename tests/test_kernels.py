@@ -0,0 +1,180 @@
+"""The fill, trim and alpha-snap kernels against plain reference loops.
+
+Each kernel has a Numba, a NumPy and a pure-Python path; all of them are
+checked against the straightforward per-pixel versions they replaced.
+"""
+import random
+import unittest
+from unittest import mock
+
+from PyQt5.QtGui import QColor, QImage, QPixmap
+
+from util import claudepaint
+
+np = claudepaint.np
+CANVAS_FORMAT = claudepaint.CANVAS_FORMAT
+PALETTE = (0x00000000, 0xFF000000, 0xFFFFFFFF, 0xFF3366CC)
+
+
+def random_image(rng, w, h, values):
+    img = QImage(w, h, CANVAS_FORMAT)
+    for y in range(h):
+        for x in range(w):
+            img.setPixel(x, y, rng.choice(values))
+    return img
+
+
+def pixels(img):
+    return [[img.pixel(x, y) for x in range(img.width())]
+            for y in range(img.height())]
+
+
+def reference_fill(rows, x, y, fill):
+    """4-connected breadth-first fill; returns (rows, bbox or None)."""
+    rows = [row[:] for row in rows]
+    h, w = len(rows), len(rows[0])
+    target = rows[y][x]
+    if target == fill:
+        return rows, None
+    rows[y][x] = fill
+    todo = [(x, y)]
+    x0, y0, x1, y1 = x, y, x, y
+    while todo:
+        cx, cy = todo.pop()
+        x0, y0 = min(x0, cx), min(y0, cy)
+        x1, y1 = max(x1, cx), max(y1, cy)
+        for nx, ny in ((cx - 1, cy), (cx + 1, cy), (cx, cy - 1), (cx, cy + 1)):
+            if 0 <= nx < w and 0 <= ny < h and rows[ny][nx] == target:
+                rows[ny][nx] = fill
+                todo.append((nx, ny))
+    return rows, (x0, y0, x1, y1)
+
+
+def reference_bounds(img):
+    """Bounding box of pixels that are neither transparent nor white."""
+    img = img.convertToFormat(QImage.Format_ARGB32)
+    box = None
+    for y in range(img.height()):
+        for x in range(img.width()):
+            c = QColor.fromRgba(img.pixel(x, y))
+            if c.alpha() == 0 or (c.red(), c.green(), c.blue()) == (255,) * 3:
+                continue
+            if box is None:
+                box = [x, y, x, y]
+            box = [min(box[0], x), min(box[1], y),
+                   max(box[2], x), max(box[3], y)]
+    return None if box is None else tuple(box)
+
+
+def reference_snap(img):
+    """ARGB32 pixels with alpha 0 cleared and every other alpha set to 255."""
+    img = img.convertToFormat(QImage.Format_ARGB32)
+    return [[0 if v < 0x01000000 else v | 0xFF000000 for v in row]
+            for row in pixels(img)]
+
+
+def kernel_paths(*names):
+    """Yield (label, patches) for each implementation: compiled when Numba
+    is present, then NumPy, then pure Python."""
+    if claudepaint.njit is not None and np is not None:
+        yield "numba", []
+    if np is not None:
+        yield "numpy", [mock.patch.object(claudepaint, name, None)
+                        for name in names]
+    yield "python", [mock.patch.object(claudepaint, "np", None)]
+
+
+class KernelTestCase(unittest.TestCase):
+    def run_paths(self, names, check):
+        for label, patches in kernel_paths(*names):
+            with self.subTest(path=label):
+                for p in patches:
+                    p.start()
+                try:
+                    check(label)
+                finally:
+                    for p in reversed(patches):
+                        p.stop()
+
+
+class FillTest(KernelTestCase):
+    def check_fill(self, label):
+        rng = random.Random(1)
+        for case in range(60):
+            w, h = rng.randint(1, 24), rng.randint(1, 24)
+            img = random_image(rng, w, h, PALETTE[:rng.randint(2, 4)])
+            x, y = rng.randrange(w), rng.randrange(h)
+            fill = rng.choice(PALETTE)
+            expected, box = reference_fill(pixels(img), x, y, fill)
+            if claudepaint.np is None:
+                dirty = claudepaint._queue_fill(img, x, y, fill)
+                box = box and (0, 0, w - 1, h - 1)
+            else:
+                dirty = claudepaint._scanline_fill(
+                    claudepaint._image_array(img), x, y, fill)
+            got = dirty and (dirty.left(), dirty.top(),
+                             dirty.right(), dirty.bottom())
+            self.assertEqual(pixels(img), expected, case)
+            self.assertEqual(got, box, case)
+
+    def test_matches_reference(self):
+        self.run_paths(["_scanline_fill_jit"], self.check_fill)
+
+
+class TrimTest(KernelTestCase):
+    def check_bounds(self, label):
+        rng = random.Random(2)
+        # Straight colours, including white and near-white at partial alpha
+        values = [0, 0xFFFFFFFF, 0x80FFFFFF, 0x01FFFFFF, 0xFF000000,
+                  0x40FEFEFE, 0x80102030, 0x00FF0000]
+        for case in range(60):
+            w, h = rng.randint(1, 20), rng.randint(1, 20)
+            straight = QImage(w, h, QImage.Format_ARGB32)
+            straight.fill(rng.choice((0, 0xFFFFFFFF)))
+            for _ in range(rng.randint(0, 4)):
+                straight.setPixel(rng.randrange(w), rng.randrange(h),
+                                  rng.choice(values))
+            img = straight.convertToFormat(CANVAS_FORMAT)
+            dialog = claudepaint.ResizeDialog(w, h, image=img)
+            self.assertEqual(dialog._content_bounds(), reference_bounds(img),
+                             case)
+
+    def test_matches_reference(self):
+        self.run_paths(["_content_bounds_jit"], self.check_bounds)
+
+    @unittest.skipIf(claudepaint.njit is None or np is None, "needs Numba")
+    def test_warm_up_covers_trim_signature(self):
+        claudepaint._warm_up_kernels()
+        before = len(claudepaint._content_bounds_jit.signatures)
+        img = QImage(8, 8, CANVAS_FORMAT)
+        img.fill(0xFF000000)
+        claudepaint.ResizeDialog(8, 8, image=img)._content_bounds()
+        self.assertEqual(len(claudepaint._content_bounds_jit.signatures),
+                         before)
+
+
+class AlphaSnapTest(KernelTestCase):
+    def check_snap(self, label):
+        rng = random.Random(3)
+        for case in range(40):
+            w, h = rng.randint(1, 20), rng.randint(1, 20)
+            img = QImage(w, h, QImage.Format_ARGB32)
+            for y in range(h):
+                for x in range(w):
+                    img.setPixel(x, y, rng.choice(
+                        (0, 0x00FFFFFF, 0x01FF0000, 0x7F00FF00, 0xFF0000FF,
+                         rng.getrandbits(32))))
+            # The pixmap may store the pixels premultiplied, so the
+            # reference starts from what it hands back too
+            pixmap = QPixmap.fromImage(img)
+            snapped = claudepaint.SelectionTool._snap_alpha(pixmap)
+            got = pixels(snapped.toImage().convertToFormat(
+                QImage.Format_ARGB32))
+            self.assertEqual(got, reference_snap(pixmap.toImage()), case)
+
+    def test_matches_reference(self):
+        self.run_paths(["_snap_alpha_jit"], self.check_snap)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,44 @@
+import os
+import subprocess
+import sys
+import unittest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def run_logging(code):
+    env = dict(os.environ, QT_QPA_PLATFORM="offscreen")
+    env.pop("CLAUDEPAINT_DEBUG", None)
+    return subprocess.run(
+        [sys.executable, "-c", "import claudepaint\nlog = claudepaint.log\n"
+         + code], cwd=ROOT, env=env, capture_output=True, text=True,
+        timeout=60)
+
+
+class DefaultLoggingTest(unittest.TestCase):
+    def test_errors_reach_stderr_without_debug_log(self):
+        result = run_logging(
+            "log.info('quiet')\n"
+            "try:\n"
+            "    1 / 0\n"
+            "except ZeroDivisionError:\n"
+            "    log.error('[action ERROR] test', exc_info=True)\n")
+        self.assertIn("[action ERROR] test", result.stderr)
+        self.assertIn("ZeroDivisionError", result.stderr)
+        self.assertNotIn("quiet", result.stderr)
+
+    def test_embedder_handlers_receive_records(self):
+        result = run_logging(
+            "import logging\n"
+            "seen = []\n"
+            "class Keep(logging.Handler):\n"
+            "    def emit(self, record):\n"
+            "        seen.append(record.getMessage())\n"
+            "logging.getLogger().addHandler(Keep())\n"
+            "log.warning('kept')\n"
+            "print(seen)\n")
+        self.assertEqual(result.stdout.strip(), "['kept']")
+
+
+if __name__ == "__main__":
+    unittest.main()
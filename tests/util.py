@@ -0,0 +1,62 @@
+"""Shared setup for the tests: an offscreen QApplication and fake events."""
+import os
+import sys
+import time
+
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from PyQt5.QtCore import QPoint, Qt
+from PyQt5.QtWidgets import QApplication
+
+app = QApplication.instance() or QApplication([])
+
+import claudepaint  # noqa: E402  (needs the QApplication above)
+
+
+class MouseEvent:
+    """The parts of QMouseEvent the tools read, in canvas coordinates."""
+
+    def __init__(self, x, y, button=Qt.LeftButton, modifiers=Qt.NoModifier):
+        self._pos = QPoint(x, y)
+        self._button = button
+        self._modifiers = modifiers
+
+    def pos(self):
+        return self._pos
+
+    def button(self):
+        return self._button
+
+    def buttons(self):
+        return self._button
+
+    def modifiers(self):
+        return self._modifiers
+
+
+def settle(rounds=5):
+    """Let pending timers (stroke flushes, coalesced repaints) fire."""
+    for _ in range(rounds):
+        app.processEvents()
+        time.sleep(0.02)
+
+
+def make_window():
+    """Return a shown PaintApp with the canvas at zoom 1 and no pan, so
+    widget and canvas coordinates coincide."""
+    window = claudepaint.PaintApp()
+    window.show()
+    canvas = window.canvas
+    canvas._pending_center = False
+    canvas.set_zoom(1.0)
+    canvas._pan_offset = QPoint(0, 0)
+    settle()
+    return window
+
+
+def close_window(window):
+    window.canvas.set_modified(False)
+    window._finish_save(wait=True)
+    window.close()
+    settle(1)